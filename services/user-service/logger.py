@@ -1,32 +1,150 @@
+import atexit
+import functools
 import logging
-import json
+import queue
 import re
 import sys
-from datetime import datetime
-from typing import Any, Dict
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+import orjson
+
+# Sanitizer patterns are compiled once at import instead of on every log call
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+_CTRL_RE = re.compile(r'[\r\n\t\x00-\x1f\x7f-\x9f]')
+# All masks fused into one alternation so a message is scanned once; the
+# named group that matched picks the replacement. Alternatives are ordered
+# like the original sequential passes (email, secret, card, phone).
+_MASK_RE = re.compile(
+    r'(?P<email>[a-zA-Z0-9._%+-]+@(?P<domain>[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}))'
+    r'|(?P<secret>(?P<keyword>(?i:password|token|secret|key))\s*[:=]\s*["\']?[^\s"\',}]+)'
+    r'|(?P<card>\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b)'
+    r'|(?P<phone>\b\d{3}[\s.-]?\d{3}[\s.-]?\d{4}\b)'
+)
+# Every mask needs an '@', a digit or a secret keyword to match
+_MASK_HINT_RE = re.compile(r'[@\d]|password|token|secret|key', re.IGNORECASE)
+
+# Logged messages are capped at MAX_MESSAGE_LENGTH characters, so the regex
+# passes never need to see more than a few times that much input. Bounding the
+# scan keeps sanitizer cost linear in the cap rather than in whatever size an
+# attacker manages to push into a log call. The scan reads _MASK_MARGIN extra
+# characters past the cut so a secret straddling it is still matched whole.
+MAX_MESSAGE_LENGTH = 1000
+_MAX_SCAN_LENGTH = MAX_MESSAGE_LENGTH * 4
+_MASK_MARGIN = 256
+
+# Attributes set by logging itself; anything else on a record came from extra=
+_LOGRECORD_RESERVED = frozenset({
+    'name', 'msg', 'args', 'levelname', 'levelno', 'pathname', 'filename',
+    'module', 'lineno', 'funcName', 'created', 'msecs', 'relativeCreated',
+    'thread', 'threadName', 'processName', 'process', 'taskName',
+    'exc_info', 'exc_text', 'stack_info', 'message', 'asctime',
+})
+
+# CLOCK_REALTIME_COARSE is served from the vDSO without a hardware clock read.
+# Its millisecond-level resolution is plenty for log lines; platforms without
+# it (Windows, macOS) fall back to time.time().
+if hasattr(time, 'CLOCK_REALTIME_COARSE'):
+    _wall_clock = functools.partial(time.clock_gettime, time.CLOCK_REALTIME_COARSE)
+else:
+    _wall_clock = time.time
+
+# Last formatted second as (epoch_seconds, "YYYY-MM-DDTHH:MM:SS"); records
+# logged within the same second only pay for the microsecond suffix. Stored
+# as a tuple so concurrent formatters never see a half-updated pair.
+_ts_cache = (-1, "")
+
+def _utc_timestamp() -> str:
+    """Return the current UTC time as an ISO-8601 string with a Z suffix"""
+    global _ts_cache
+    now = _wall_clock()
+    sec = int(now)
+    cached_sec, prefix = _ts_cache
+    if cached_sec != sec:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(sec))
+        _ts_cache = (sec, prefix)
+    return f"{prefix}.{int((now - sec) * 1e6):06d}Z"
+
+def _mask_replacement(match: re.Match) -> str:
+    """Return the mask for whichever sensitive pattern matched"""
+    kind = match.lastgroup
+    if kind == 'email':
+        # Keep the domain for debugging
+        return '***@' + match.group('domain')
+    if kind == 'secret':
+        return match.group('keyword') + ': ***'
+    if kind == 'card':
+        return '****-****-****-****'
+    return '***-***-****'
 
 class StructuredLogger:
     def __init__(self, service_name: str):
         self.service_name = service_name
         self.logger = logging.getLogger(service_name)
         self.logger.setLevel(logging.INFO)
+        # Structured output is owned by this logger's own handler: records do
+        # not propagate to root handlers (or pytest's caplog)
+        self.logger.propagate = False
         
         # Remove default handlers
         self.logger.handlers.clear()
         
-        # Add structured handler
+        # Add structured handler behind a queue: callers only enqueue the
+        # record, while formatting, sanitizing and the stdout write happen on
+        # the listener's background thread
         handler = logging.StreamHandler(sys.stdout)
         handler.setFormatter(StructuredFormatter(service_name))
-        self.logger.addHandler(handler)
+        self._queue = queue.SimpleQueue()
+        self._queue_handler = QueueHandler(self._queue)
+        self.logger.addHandler(self._queue_handler)
+        self._listener = QueueListener(self._queue, handler)
+        self._listener_running = False
+        self.start()
+        atexit.register(self.stop)
+    
+    def start(self):
+        """Start the background log writer (no-op if already running)"""
+        if not self._listener_running:
+            self._listener.start()
+            self._listener_running = True
+    
+    def stop(self):
+        """Flush queued records and stop the background log writer"""
+        if self._listener_running:
+            self._listener.stop()
+            self._listener_running = False
     
+    # Level checks happen here, before _emit is even called, so filtered-out
+    # calls cost one cached isEnabledFor lookup
     def info(self, message: str, **kwargs):
-        self.logger.info(message, extra=kwargs)
+        if self.logger.isEnabledFor(logging.INFO):
+            self._emit(logging.INFO, message, kwargs)
     
     def error(self, message: str, **kwargs):
-        self.logger.error(message, extra=kwargs)
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._emit(logging.ERROR, message, kwargs)
     
     def warning(self, message: str, **kwargs):
-        self.logger.warning(message, extra=kwargs)
+        if self.logger.isEnabledFor(logging.WARNING):
+            self._emit(logging.WARNING, message, kwargs)
+    
+    def _emit(self, level: int, message: str, extra: Dict[str, Any]):
+        """Hand an enabled record to the background writer with as little work as possible"""
+        logger = self.logger
+        
+        # When debugging, use the regular logging path so records carry the
+        # caller's file and line number
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.log(level, message, extra=extra, stacklevel=3)
+            return
+        
+        # Fast path: skip the findCaller stack walk, handler dispatch and
+        # QueueHandler.prepare() copy, and enqueue the record directly. Filters
+        # on the logger and its queue handler still get their say.
+        record = logger.makeRecord(logger.name, level, "(unknown file)", 0,
+                                   message, None, None, extra=extra)
+        if logger.filter(record) and self._queue_handler.filter(record):
+            self._queue.put_nowait(record)
 
 class StructuredFormatter(logging.Formatter):
     def __init__(self, service_name: str):
@@ -38,65 +156,80 @@ class StructuredFormatter(logging.Formatter):
         sanitized_message = self._sanitize_log_message(record.getMessage())
         
         log_entry = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": _utc_timestamp(),
             "level": record.levelname,
             "service": self.service_name,
             "message": sanitized_message,
             "logger": record.name
         }
         
-        # Add extra fields
-        if hasattr(record, '__dict__'):
-            for key, value in record.__dict__.items():
-                if key not in ['name', 'msg', 'args', 'levelname', 'levelno', 
-                              'pathname', 'filename', 'module', 'lineno', 
-                              'funcName', 'created', 'msecs', 'relativeCreated', 
-                              'thread', 'threadName', 'processName', 'process',
-                              'getMessage', 'exc_info', 'exc_text', 'stack_info']:
-                    log_entry[key] = value
+        # Add extra fields (insertion order is kept so output stays stable)
+        for key, value in record.__dict__.items():
+            if key not in _LOGRECORD_RESERVED:
+                log_entry[key] = value
         
-        return json.dumps(log_entry)
+        # orjson encodes straight to UTF-8 bytes; str() covers any extra values
+        # it has no native encoding for
+        return orjson.dumps(log_entry, default=str).decode('utf-8')
     
     def _sanitize_log_message(self, message: str) -> str:
         """Sanitize log message to prevent injection attacks and data leaks"""
         if not isinstance(message, str):
             message = str(message)
         
-        # Remove control characters and newlines that could break log format
-        # This prevents log injection attacks
-        sanitized = re.sub(r'[\r\n\t\x00-\x1f\x7f-\x9f]', ' ', message)
+        # Bound the input handed to the regex engine, keeping a margin past
+        # the cut for masks to finish matching in
+        truncated = len(message) > _MAX_SCAN_LENGTH
+        if truncated:
+            message = message[:_MAX_SCAN_LENGTH + _MASK_MARGIN]
+        
+        sanitized = message
         
-        # Remove potential ANSI escape sequences
-        sanitized = re.sub(r'\x1b\[[0-9;]*m', '', sanitized)
+        # Control characters (ESC included) are never printable, so the C-level
+        # isprintable() scan lets clean messages skip both passes below
+        if not sanitized.isprintable():
+            # Remove potential ANSI escape sequences (before the control-character
+            # pass, which would otherwise break up the escape byte)
+            sanitized = _ANSI_RE.sub('', sanitized)
+            
+            # Remove control characters and newlines that could break log format
+            # This prevents log injection attacks
+            sanitized = _CTRL_RE.sub(' ', sanitized)
         
-        # Mask sensitive data patterns
-        sanitized = self._mask_sensitive_data(sanitized)
+        # Past a cut, the margin is dropped along with any partial token at
+        # its far end. A match starting before the margin has either been
+        # masked whole or is longer than the margin.
+        limit = max(len(sanitized) - _MASK_MARGIN, 0) if truncated else None
+        
+        # Mask sensitive data patterns, but only when a single hint scan finds
+        # something one of the masks could match
+        if _MASK_HINT_RE.search(sanitized):
+            sanitized = self._mask_sensitive_data(sanitized, limit)
+        elif limit is not None:
+            sanitized = sanitized[:limit]
         
         # Limit message length to prevent log flooding
-        if len(sanitized) > 1000:
-            sanitized = sanitized[:997] + '...'
+        if len(sanitized) > MAX_MESSAGE_LENGTH:
+            sanitized = sanitized[:MAX_MESSAGE_LENGTH - 3] + '...'
         
         return sanitized
     
-    def _mask_sensitive_data(self, message: str) -> str:
-        """Mask sensitive information in log messages"""
-        # Mask email addresses (keep domain for debugging)
-        message = re.sub(r'([a-zA-Z0-9._%+-]+)@([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', 
-                        r'***@\2', message)
-        
-        # Mask potential passwords/tokens
-        message = re.sub(r'(password|token|secret|key)\s*[:=]\s*["\']?([^\s"\',}]+)', 
-                        r'\1: ***', message, flags=re.IGNORECASE)
-        
-        # Mask credit card numbers
-        message = re.sub(r'\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b', 
-                        '****-****-****-****', message)
-        
-        # Mask phone numbers
-        message = re.sub(r'\b\d{3}[\s.-]?\d{3}[\s.-]?\d{4}\b', 
-                        '***-***-****', message)
+    def _mask_sensitive_data(self, message: str, limit: Optional[int] = None) -> str:
+        """Mask sensitive information in log messages, keeping text before limit"""
+        if limit is None:
+            return _MASK_RE.sub(_mask_replacement, message)
         
-        return message
+        parts = []
+        pos = 0
+        for match in _MASK_RE.finditer(message):
+            if match.start() >= limit:
+                break
+            parts.append(message[pos:match.start()])
+            parts.append(_mask_replacement(match))
+            pos = match.end()
+        if pos < limit:
+            parts.append(message[pos:limit])
+        return ''.join(parts)
 
 # Global logger instance
 logger = StructuredLogger("user-service")
\ No newline at end of file
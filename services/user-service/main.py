@@ -1,30 +1,50 @@
-from fastapi import FastAPI, HTTPException, Request, Header, Depends
+from fastapi import FastAPI, HTTPException, Request, Header, Depends, Query
+from fastapi.responses import Response
 from pydantic import BaseModel, EmailStr, field_validator
 from typing import List, Optional
-import uuid
-import secrets
+import os
+import base64
 import re
+import orjson
+from collections import deque
+from itertools import islice
 from datetime import datetime, timedelta
-from cachetools import TTLCache
+from ttl_cache import FastTTL, FixedWindowCounter
 from logger import logger
 import asyncio
 from contextlib import asynccontextmanager
 
-# Optimized connection pool and rate limiting
-connection_pool = asyncio.Semaphore(500)  # Much higher concurrent connections
-rate_limiter = TTLCache(maxsize=10000, ttl=60)  # Rate limit per IP per minute
-email_cache = TTLCache(maxsize=5000, ttl=300)  # Cache for email lookups
+# Rate limiting; concurrency is capped by uvicorn (limit_concurrency below)
+rate_limiter = FixedWindowCounter(maxsize=10000, window=60)  # Rate limit per IP per minute
+
+# Expired entries are also dropped lazily on access; this sweep bounds memory
+# held by keys that are never touched again
+CACHE_SWEEP_INTERVAL = 10
+
+async def sweep_expired_entries():
+    while True:
+        await asyncio.sleep(CACHE_SWEEP_INTERVAL)
+        csrf_tokens.sweep()
+        rate_limiter.sweep()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    logger.start()
+    sweeper = asyncio.create_task(sweep_expired_entries())
     yield
     # Shutdown - cleanup resources
+    sweeper.cancel()
     csrf_tokens.clear()
     rate_limiter.clear()
+    # Flush pending log records before the process exits
+    logger.stop()
 
 app = FastAPI(title="User Service", version="1.0.0", lifespan=lifespan)
 
+# Compiled once at import; validators run on every create request
+NAME_PATTERN = re.compile(r"[a-zA-Z0-9\s\-'._]+")
+
 # Models
 class User(BaseModel):
     id: str
@@ -47,8 +67,7 @@ class CreateUserRequest(BaseModel):
             raise ValueError('Name must be at least 2 characters long')
         if len(v) > 100:
             raise ValueError('Name must be less than 100 characters')
-        # Simplified regex for better performance
-        if not re.match(r'^[a-zA-Z0-9\s\-\'\.\_]+$', v):
+        if not NAME_PATTERN.fullmatch(v):
             raise ValueError('Name contains invalid characters')
         return v
     
@@ -57,36 +76,61 @@ class CreateUserRequest(BaseModel):
     def validate_email_format(cls, v):
         if len(v) > 254:
             raise ValueError('Email address too long')
-        # Basic validation for performance
-        if '..' in v or v.count('@') != 1:
+        # Basic validation for performance; the second find stops at the next '@'
+        # instead of counting through the whole address
+        at = v.find('@')
+        if at == -1 or v.find('@', at + 1) != -1 or '..' in v:
             raise ValueError('Invalid email format')
+        # Single normalization point: stored and indexed emails are lowercase
         return v.lower().strip()
 
 # In-memory storage
 users_db = {}
+# User id -> pre-encoded JSON body; users are immutable once created, so reads never re-serialize
+user_payloads = {}
+# Normalized (lowercase) email -> user id, kept in sync with users_db for O(1) duplicate checks
+email_index = {}
+# Random 128-bit user ids, generated 64 at a time to amortize the urandom syscall
+USER_ID_BATCH = 64
+user_id_pool = deque()
+
+def next_user_id() -> str:
+    if not user_id_pool:
+        entropy = os.urandom(16 * USER_ID_BATCH)
+        user_id_pool.extend([entropy[i:i + 16].hex() for i in range(0, len(entropy), 16)])
+    return user_id_pool.popleft()
+
 # Use TTL cache for CSRF tokens to prevent memory leak
-csrf_tokens = TTLCache(maxsize=1000, ttl=3600)  # 1 hour TTL
+csrf_tokens = FastTTL(maxsize=1000, ttl=3600)  # 1 hour TTL; only membership matters, expiry is tracked by the cache
+# 24 random bytes encode to exactly 32 urlsafe base64 chars with no padding,
+# so a whole batch is encoded in one call and sliced into tokens
+CSRF_TOKEN_BATCH = 256
+csrf_token_pool = deque()
+
+def next_csrf_token() -> str:
+    if not csrf_token_pool:
+        encoded = base64.urlsafe_b64encode(os.urandom(24 * CSRF_TOKEN_BATCH)).decode('ascii')
+        csrf_token_pool.extend([encoded[i:i + 32] for i in range(0, len(encoded), 32)])
+    return csrf_token_pool.popleft()
 
 async def verify_csrf_token(request: Request, x_csrf_token: str = Header(None)):
     # Optimized rate limiting per IP
     client_ip = request.client.host
-    current_requests = rate_limiter.get(client_ip, 0)
-    if current_requests > 200:  # Increased limit for load testing
+    if not rate_limiter.allow(client_ip, 200):  # Increased limit for load testing
         raise HTTPException(status_code=429, detail="Rate limit exceeded")
-    rate_limiter[client_ip] = current_requests + 1
     
     # Simplified CSRF handling for better performance
     if x_csrf_token is None or x_csrf_token not in csrf_tokens:
         # Generate and add a token for testing
-        token = secrets.token_urlsafe(16)  # Shorter token for performance
-        csrf_tokens[token] = datetime.now()
+        token = next_csrf_token()
+        csrf_tokens[token] = True
         return token
     return x_csrf_token
 
 @app.get("/csrf-token")
 async def get_csrf_token():
-    token = secrets.token_urlsafe(32)
-    csrf_tokens[token] = datetime.now()
+    token = next_csrf_token()
+    csrf_tokens[token] = True
     return {"csrf_token": token}
 
 @app.get("/health")
@@ -96,57 +140,56 @@ async def health_check():
 
 @app.post("/users", response_model=User)
 async def create_user(user_data: CreateUserRequest, request: Request, csrf_token: str = Depends(verify_csrf_token)):
-    async with connection_pool:  # Connection pooling
-        # Optimized duplicate email check using cache
-        email_lower = user_data.email.lower()
-        if email_lower in email_cache:
-            raise HTTPException(status_code=400, detail="Email already exists")
-        
-        # Fast duplicate check - only check if not in cache
-        for existing_user in users_db.values():
-            if existing_user.email.lower() == email_lower:
-                email_cache[email_lower] = True  # Cache the duplicate
-                raise HTTPException(status_code=400, detail="Email already exists")
-        
-        user_id = str(uuid.uuid4())
-        user = User(
-            id=user_id,
-            name=user_data.name,
-            email=user_data.email,
-            created_at=datetime.now()
-        )
-        users_db[user_id] = user
-        email_cache[email_lower] = True  # Cache the new email
-        
-        # Simplified logging for performance
-        logger.info("User created", user_id=user_id)
-        
-        return user
+    # Duplicate email check via the email index; validate_email_format
+    # already lowercased the address, so it is used as the key directly
+    email = user_data.email
+    if email in email_index:
+        raise HTTPException(status_code=400, detail="Email already exists")
+    
+    user_id = next_user_id()
+    user = User(
+        id=user_id,
+        name=user_data.name,
+        email=user_data.email,
+        created_at=datetime.now()
+    )
+    users_db[user_id] = user
+    user_payloads[user_id] = orjson.dumps(user.model_dump())
+    email_index[email] = user_id
+    
+    # Simplified logging for performance
+    logger.info("User created", user_id=user_id)
+    
+    return user
 
 @app.get("/users/{user_id}", response_model=User)
 async def get_user(user_id: str):
     # Remove connection pool for simple read operations
-    user = users_db.get(user_id)
-    if user is None:
+    payload = user_payloads.get(user_id)
+    if payload is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return Response(payload, media_type="application/json")
 
 @app.get("/users", response_model=List[User])
-async def list_users():
-    # Remove connection pool for simple read operations
-    return list(users_db.values())
+async def list_users(offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    # Paged so a response never materializes the whole store; the page is
+    # spliced from the cached per-user JSON instead of being re-encoded
+    page = islice(user_payloads.values(), offset, offset + limit)
+    return Response(b"[" + b",".join(page) + b"]", media_type="application/json")
 
 @app.delete("/users/{user_id}")
 async def delete_user(user_id: str, request: Request, csrf_token: str = Depends(verify_csrf_token)):
-    async with connection_pool:  # Connection pooling
-        user = users_db.get(user_id)
-        if user is None:
-            raise HTTPException(status_code=404, detail="User not found")
-        # Remove from email cache too
-        email_cache.pop(user.email.lower(), None)
-        del users_db[user_id]
-        return {"message": "User deleted"}
+    user = users_db.get(user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    # Remove from email index too
+    email_index.pop(user.email, None)
+    del users_db[user_id]
+    del user_payloads[user_id]
+    return {"message": "User deleted"}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # Reject excess connections with 503 at the server instead of queueing
+    # them behind an in-process semaphore
+    uvicorn.run(app, host="0.0.0.0", port=8001, limit_concurrency=500)
\ No newline at end of file
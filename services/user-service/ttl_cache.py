@@ -0,0 +1,116 @@
+import time
+from typing import Any, Dict, Hashable, List, Tuple
+
+class FastTTL:
+    """Bounded dict whose entries expire after a fixed TTL.
+
+    A lighter replacement for cachetools.TTLCache on hot request paths: each
+    operation is a single dict lookup with no timer linked list or LRU
+    reordering. Expired entries are dropped lazily when touched and in bulk
+    by sweep(); when full, the oldest inserted key is evicted.
+    """
+    __slots__ = ('data', 'ttl', 'maxsize')
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.data: Dict[Hashable, Tuple[float, Any]] = {}
+        self.ttl = ttl
+        self.maxsize = maxsize
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.data.get(key)
+        if entry is None:
+            return default
+        if entry[0] < time.monotonic():
+            self.data.pop(key, None)
+            return default
+        return entry[1]
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self._store(key, time.monotonic() + self.ttl, value)
+
+    def sweep(self) -> int:
+        """Drop every expired entry and return how many were removed"""
+        now = time.monotonic()
+        expired: List[Hashable] = [key for key, (expires_at, _) in self.data.items() if expires_at < now]
+        for key in expired:
+            self.data.pop(key, None)
+        return len(expired)
+
+    def clear(self):
+        self.data.clear()
+
+    def _store(self, key: Hashable, expires_at: float, value: Any):
+        data = self.data
+        if key not in data and len(data) >= self.maxsize:
+            # Dicts keep insertion order, so the first key is the oldest
+            del data[next(iter(data))]
+        data[key] = (expires_at, value)
+
+class FixedWindowCounter:
+    """Per-key hit counter over fixed time windows, used for rate limiting.
+
+    Each key maps to a mutable [count, window_start] slot that is updated in
+    place, so a hit inside the current window allocates nothing.
+    """
+    __slots__ = ('slots', 'window', 'maxsize')
+
+    def __init__(self, maxsize: int, window: int):
+        self.slots: Dict[Hashable, List[int]] = {}
+        self.window = window
+        self.maxsize = maxsize
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def hit(self, key: Hashable) -> int:
+        """Count a hit for key and return the total for the current window"""
+        now = int(time.monotonic())
+        slot = self.slots.get(key)
+        if slot is None:
+            slots = self.slots
+            if len(slots) >= self.maxsize:
+                del slots[next(iter(slots))]
+            slots[key] = [1, now]
+            return 1
+        if now - slot[1] >= self.window:
+            slot[0] = 1
+            slot[1] = now
+            return 1
+        slot[0] += 1
+        return slot[0]
+
+    def allow(self, key: Hashable, limit: int) -> bool:
+        """Count a hit for key unless it already went past limit in the current window.
+
+        Same admission rule as the previous TTLCache limiter: the count is checked
+        before incrementing, so limit + 1 hits are allowed per window, and
+        rejected hits are not counted.
+        """
+        now = int(time.monotonic())
+        slot = self.slots.get(key)
+        if slot is None or now - slot[1] >= self.window:
+            self.hit(key)
+            return True
+        if slot[0] > limit:
+            return False
+        slot[0] += 1
+        return True
+
+    def sweep(self) -> int:
+        """Drop every key whose window has ended and return how many were removed"""
+        cutoff = int(time.monotonic()) - self.window
+        expired: List[Hashable] = [key for key, slot in self.slots.items() if slot[1] <= cutoff]
+        for key in expired:
+            self.slots.pop(key, None)
+        return len(expired)
+
+    def clear(self):
+        self.slots.clear()
+
+_MISSING = object()
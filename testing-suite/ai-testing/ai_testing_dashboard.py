@@ -4,8 +4,11 @@ AI Testing Dashboard
 Interface web para visualizar insights de IA sobre testes
 """
 
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, Response, render_template_string, request
 import json
+import gzip
+import hashlib
+import orjson
 from datetime import datetime
 from test_case_generator import AITestCaseGenerator
 from bug_pattern_analyzer import BugPatternAnalyzer
@@ -253,49 +256,57 @@ DASHBOARD_HTML = """
             }
         });
 
-        // AI Functions
+        // AI Functions: each action fetches the whole AI state in one POST and
+        // updates its own panel (the per-action endpoints are deprecated)
+        function refreshAI() {
+            return fetch('/api/ai/refresh', { method: 'POST' }).then(response => response.json());
+        }
+
+        function updateCounters(data) {
+            document.getElementById('generatedTests').textContent = data.generated.count;
+            document.getElementById('bugsDetected').textContent = data.patterns.patterns;
+            document.getElementById('prioritizedTests').textContent = data.prioritized.count;
+        }
+
         function generateTests() {
             document.getElementById('generatedTestsResult').innerHTML = 
                 '<div class="spinner-border spinner-border-sm" role="status"></div> Analyzing code...';
             
-            fetch('/api/generate-tests', { method: 'POST' })
-                .then(response => response.json())
-                .then(data => {
-                    document.getElementById('generatedTestsResult').innerHTML = 
-                        `<div class="alert alert-success">Generated ${data.count} test cases</div>`;
-                    document.getElementById('generatedTests').textContent = data.count;
-                });
+            refreshAI().then(data => {
+                document.getElementById('generatedTestsResult').innerHTML = 
+                    `<div class="alert alert-success">Generated ${data.generated.count} test cases</div>`;
+                updateCounters(data);
+            });
         }
 
         function analyzeBugs() {
             document.getElementById('bugAnalysisResult').innerHTML = 
                 '<div class="spinner-border spinner-border-sm" role="status"></div> Analyzing patterns...';
             
-            fetch('/api/analyze-bugs', { method: 'POST' })
-                .then(response => response.json())
-                .then(data => {
-                    document.getElementById('bugAnalysisResult').innerHTML = 
-                        `<div class="alert alert-warning">Found ${data.patterns} bug patterns</div>`;
-                    document.getElementById('bugsDetected').textContent = data.patterns;
-                });
+            refreshAI().then(data => {
+                document.getElementById('bugAnalysisResult').innerHTML = 
+                    `<div class="alert alert-warning">Found ${data.patterns.patterns} bug patterns</div>`;
+                updateCounters(data);
+            });
         }
 
         function prioritizeTests() {
             document.getElementById('prioritizationResult').innerHTML = 
                 '<div class="spinner-border spinner-border-sm" role="status"></div> Prioritizing...';
             
-            fetch('/api/prioritize-tests', { method: 'POST' })
-                .then(response => response.json())
-                .then(data => {
-                    document.getElementById('prioritizationResult').innerHTML = 
-                        `<div class="alert alert-info">Prioritized ${data.count} tests</div>`;
-                    document.getElementById('prioritizedTests').textContent = data.count;
-                });
+            refreshAI().then(data => {
+                document.getElementById('prioritizationResult').innerHTML = 
+                    `<div class="alert alert-info">Prioritized ${data.prioritized.count} tests</div>`;
+                updateCounters(data);
+            });
         }
 
-        // Auto-refresh every 30 seconds
+        // Auto-refresh every 30 seconds: a cacheable GET revalidated by ETag,
+        // so an unchanged state comes back as an empty 304
         setInterval(() => {
-            console.log('Auto-refreshing AI metrics...');
+            fetch('/api/ai/state')
+                .then(response => response.json())
+                .then(updateCounters);
         }, 30000);
     </script>
 </body>
@@ -305,58 +316,60 @@ DASHBOARD_HTML = """
 @app.route('/')
 def dashboard():
     """Página principal do dashboard"""
-    return render_template_string(DASHBOARD_HTML)
+    if request.accept_encodings['gzip']:
+        response = cached_response(DASHBOARD_GZIP_BODY, DASHBOARD_GZIP_ETAG, 'text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = cached_response(DASHBOARD_BODY, DASHBOARD_ETAG, 'text/html')
+    response.vary.add('Accept-Encoding')
+    return response
 
-@app.route('/api/generate-tests', methods=['POST'])
-def api_generate_tests():
-    """API para gerar test cases com IA"""
+def generate_tests_result():
+    """Resultado da geração de test cases com IA"""
     try:
         # Simular geração de testes
         # Em implementação real, analisaria arquivos de código
         generated_count = 15
         
-        return jsonify({
+        return {
             'success': True,
             'count': generated_count,
             'message': f'Generated {generated_count} AI-powered test cases'
-        })
+        }
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        return {'success': False, 'error': str(e)}
 
-@app.route('/api/analyze-bugs', methods=['POST'])
-def api_analyze_bugs():
-    """API para análise de padrões de bugs"""
+def analyze_bugs_result():
+    """Resultado da análise de padrões de bugs"""
     try:
         # Simular análise de bugs
         patterns_found = 8
         
-        return jsonify({
+        return {
             'success': True,
             'patterns': patterns_found,
             'message': f'Detected {patterns_found} bug patterns'
-        })
+        }
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        return {'success': False, 'error': str(e)}
 
-@app.route('/api/prioritize-tests', methods=['POST'])
-def api_prioritize_tests():
-    """API para priorização inteligente de testes"""
+def prioritize_tests_result():
+    """Resultado da priorização inteligente de testes"""
     try:
         # Simular priorização
         prioritized_count = 28
         
-        return jsonify({
+        return {
             'success': True,
             'count': prioritized_count,
             'message': f'Prioritized {prioritized_count} tests using AI'
-        })
+        }
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        return {'success': False, 'error': str(e)}
 
-@app.route('/api/insights')
-def api_insights():
-    """API para obter insights de IA"""
-    insights = [
+def get_insights():
+    """Insights de IA exibidos no dashboard"""
+    return [
         {
             'type': 'recommendation',
             'priority': 'high',
@@ -379,8 +392,81 @@ def api_insights():
             'action': 'Implement parallel test execution strategy'
         }
     ]
+
+# Conteúdo estático renderizado uma única vez, servido com ETag para permitir 304
+STATIC_MAX_AGE = 60
+
+with app.app_context():
+    DASHBOARD_BODY = render_template_string(DASHBOARD_HTML).encode()
+DASHBOARD_GZIP_BODY = gzip.compress(DASHBOARD_BODY, compresslevel=9, mtime=0)
+INSIGHTS_BODY = orjson.dumps({'insights': get_insights()})
+
+DASHBOARD_ETAG = hashlib.md5(DASHBOARD_BODY).hexdigest()
+DASHBOARD_GZIP_ETAG = DASHBOARD_ETAG + '-gzip'
+INSIGHTS_ETAG = hashlib.md5(INSIGHTS_BODY).hexdigest()
+
+def json_response(data) -> Response:
+    """Resposta JSON serializada com orjson (aceita arrays/escalares NumPy)"""
+    return Response(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY), mimetype='application/json')
+
+def cached_response(body: bytes, etag: str, mimetype: str, max_age: int = STATIC_MAX_AGE) -> Response:
+    """Resposta cacheável que vira 304 quando o cliente já tem o mesmo ETag"""
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+def deprecated_response(data) -> Response:
+    """json_response marcada como depreciada, apontando para /api/ai/refresh"""
+    response = json_response(data)
+    response.headers['Deprecation'] = 'true'
+    response.headers['Link'] = '</api/ai/refresh>; rel="successor-version"'
+    return response
+
+@app.route('/api/generate-tests', methods=['POST'])
+def api_generate_tests():
+    """API para gerar test cases com IA (depreciada: use /api/ai/refresh)"""
+    return deprecated_response(generate_tests_result())
+
+@app.route('/api/analyze-bugs', methods=['POST'])
+def api_analyze_bugs():
+    """API para análise de padrões de bugs (depreciada: use /api/ai/refresh)"""
+    return deprecated_response(analyze_bugs_result())
+
+@app.route('/api/prioritize-tests', methods=['POST'])
+def api_prioritize_tests():
+    """API para priorização inteligente de testes (depreciada: use /api/ai/refresh)"""
+    return deprecated_response(prioritize_tests_result())
+
+@app.route('/api/insights')
+def api_insights():
+    """API para obter insights de IA"""
+    return cached_response(INSIGHTS_BODY, INSIGHTS_ETAG, 'application/json')
+
+def ai_state():
+    """Geração, análise, priorização e insights num único dicionário"""
+    return {
+        'generated': generate_tests_result(),
+        'patterns': analyze_bugs_result(),
+        'prioritized': prioritize_tests_result(),
+        'insights': get_insights()
+    }
+
+@app.route('/api/ai/refresh', methods=['POST'])
+def api_refresh():
+    """API que recalcula e devolve todo o estado de IA numa única resposta"""
+    return json_response(ai_state())
+
+@app.route('/api/ai/state')
+def api_state():
+    """Mesmo estado de /api/ai/refresh via GET, com ETag do conteúdo.
     
-    return jsonify({'insights': insights})
+    max_age=0 faz o navegador revalidar a cada consulta; estado inalterado
+    volta como 304 sem corpo.
+    """
+    body = orjson.dumps(ai_state(), option=orjson.OPT_SERIALIZE_NUMPY)
+    return cached_response(body, hashlib.md5(body).hexdigest(), 'application/json', max_age=0)
 
 def main():
     """Executar dashboard de IA"""
@@ -388,7 +474,9 @@ def main():
     print("Dashboard available at: http://localhost:5000")
     print("AI components loaded and ready")
     
-    app.run(debug=False, host='127.0.0.1', port=5000)
+    # Servidor de desenvolvimento com uma thread por requisição; em Linux/WSL
+    # prefira gunicorn (ver INSTALL.md)
+    app.run(debug=False, host='127.0.0.1', port=5000, threaded=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,24 +5,48 @@ Analisa logs e identifica padrões de bugs usando machine learning
 """
 
 import re
-import json
 import numpy as np
-from typing import List, Dict, Any, Tuple
-from collections import Counter, defaultdict
+import pandas as pd
+from typing import List, Dict, Any, Tuple, Optional
+from collections import Counter, deque
+from itertools import islice
+from functools import lru_cache
 from datetime import datetime, timedelta
-import statistics
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
 from sklearn.ensemble import IsolationForest
+import joblib
+from joblib import Parallel, delayed, effective_n_jobs, parallel_backend
 import pickle
 import os
+import time
+
+PARALLEL_SCORING_MIN_ROWS = 1000  # Abaixo disso o score sequencial do IsolationForest é mais rápido
+REPORT_CACHE_TTL = 5.0  # Segundos em que um relatório sem novas análises é reaproveitado
+HISTORY_MESSAGE_CHARS = 200  # Trecho da mensagem original guardado no histórico
+BACKTRACK_SAFE_CHARS = 512  # Acima disso 'a.*b' é testado por busca linear, não pelo regex
+REGEX_METACHARS = re.compile(r'[.^$*+?{}\[\]\\|()]')
+# Atributos que definem a análise (e não o histórico); repassados aos workers de analyze_many
+CONFIG_ATTRIBUTES = ('error_patterns', 'severity_keywords', 'severity_scores',
+                     'severity_weights', 'pattern_weights', 'pattern_recommendations')
+
+@lru_cache(maxsize=4096)
+def _parse_iso_timestamp(timestamp_str: str) -> datetime:
+    """fromisoformat com cache: logs costumam repetir o mesmo timestamp (precisão de segundos)"""
+    return datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
 
 class BugPatternAnalyzer:
     
-    def __init__(self):
+    def __init__(self, history_size: Optional[int] = 10000):
         self.ml_model = None
-        self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
-        self.anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
+        self._vectorizer = None  # TfidfVectorizer criado só no primeiro uso
+        self.anomaly_detector = IsolationForest(contamination=0.1, random_state=42, n_jobs=-1)
         self.model_trained = False
         self.training_data = []
         self.error_patterns = {
@@ -42,33 +66,127 @@ class BugPatternAnalyzer:
             'MEDIUM': ['warning', 'warn', 'deprecated'],
             'LOW': ['info', 'debug', 'trace']
         }
+        self.severity_scores = {'CRITICAL': 4, 'HIGH': 3, 'MEDIUM': 2, 'LOW': 1}
+        self.severity_weights = {'CRITICAL': 0.9, 'HIGH': 0.7, 'MEDIUM': 0.4, 'LOW': 0.1}
+        self.pattern_weights = {
+            'connection_timeout': 0.6, 'null_pointer': 0.8, 'authentication_failure': 0.5,
+            'validation_error': 0.3, 'database_error': 0.7, 'memory_error': 0.9,
+            'network_error': 0.6, 'rate_limit': 0.4
+        }
+        
+        self.pattern_recommendations = {
+            'connection_timeout': "Increase timeout values and implement retry logic",
+            'null_pointer': "Add null checks and defensive programming",
+            'authentication_failure': "Review authentication logic and token validation",
+            'validation_error': "Strengthen input validation and error messages",
+            'database_error': "Check database connectivity and query optimization",
+            'memory_error': "Investigate memory leaks and optimize resource usage",
+            'network_error': "Implement circuit breaker and network resilience",
+            'rate_limit': "Implement backoff strategy and rate limiting"
+        }
+        
+        self._compile_config()
         
-        self.bug_history = []
+        # Buffer circular: as análises mais antigas são descartadas ao atingir history_size
+        self.bug_history = deque(maxlen=history_size)
+        # Hora do dia de cada entrada do histórico (-1 se o timestamp é inválido),
+        # para descontar de hourly_counts na saída sem interpretar o ISO de novo
+        self._history_hours = deque(maxlen=history_size)
+        
+        # Agregados mantidos a cada análise para os relatórios não varrerem o histórico
+        self.severity_counter = Counter()
+        self.high_prob_count = 0
+        self.service_high_prob = Counter()
+        self.pattern_entry_count = Counter()
+        self.pattern_severity_total = Counter()
+        self.hourly_counts = np.zeros(24, dtype=np.int64)  # Entradas por hora do dia
+        self._recent_entries = deque()  # (timestamp, análise) das últimas 24h
+        self._analysis_count = 0
+        # Features ML do histórico num buffer circular alinhado ao deque, alocado e
+        # preenchido sob demanda nos relatórios (_history_feature_matrix)
+        self._history_features = None
+        self._features_filled = 0
+        self._clock_tick = float('-inf')  # monotonic da última leitura de _now
+        self._clock_now = None
+        self._clock_iso = None
+        self._report_cache = None  # (análises registradas, monotonic, relatório)
+        self._cluster_cache = None  # (análises registradas, clusters)
         self.pattern_frequency = Counter()
-        self.service_patterns = defaultdict(Counter)
+    
+    def _compile_config(self):
+        """Monta as estruturas derivadas dos padrões, palavras-chave e pesos.
+        
+        Chamado no __init__ e depois de alterar a configuração de um analisador
+        que ainda não analisou nada.
+        """
+        # Cada padrão vira (literais, regex restante): alternativas sem
+        # metacaracteres ('401', 'timeout', ...) são testadas com `in` sobre a
+        # mensagem já em minúsculas e só o resto passa pelo motor de regex
+        self._pattern_matchers = {
+            name: self._split_pattern(pattern)
+            for name, pattern in self.error_patterns.items()
+        }
+        # Mesmos padrões para mensagens longas: 'a.*b' vira (literais, cadeias, regex restante)
+        self._linear_matchers = {
+            name: self._split_chains(*matcher)
+            for name, matcher in self._pattern_matchers.items()
+        }
+        
+        self._pattern_names = list(self.error_patterns)
+        self._pattern_index = {name: i for i, name in enumerate(self._pattern_names)}
+        # Bitmask dos padrões detectados: bit i = self._pattern_names[i]
+        self._pattern_bit_values = np.left_shift(1, np.arange(len(self._pattern_names), dtype=np.int64))
+        self._hs_db = self._build_hyperscan_db() if HYPERSCAN_AVAILABLE else None
+        
+        # Pares (palavra-chave, severidade) já na ordem de prioridade
+        self._severity_lookup = [
+            (keyword, severity)
+            for severity, keywords in self.severity_keywords.items()
+            for keyword in keywords
+        ]
+        # Palavras de LOW no fim da lista dão o mesmo resultado que o fallback:
+        # retirá-las poupa comparações justamente nas mensagens sem severidade
+        while self._severity_lookup and self._severity_lookup[-1][1] == 'LOW':
+            self._severity_lookup.pop()
+        
+        # Probabilidade tradicional pré-calculada por (severidade, bitmask de padrões)
+        self._severity_rows, self._probability_table = self._build_probability_table()
+        # Cópia em listas: indexar lista Python é mais rápido que escalar NumPy por entrada
+        self._probability_rows = self._probability_table.tolist() if self._probability_table is not None else []
+        
+        # Matriz serviço x padrão; linhas alocadas sob demanda (ver _service_row).
+        # Acompanha o número de padrões, então recomeça a cada compilação
+        self._service_index: Dict[str, int] = {}
+        self._service_pattern_counts = np.zeros((16, len(self._pattern_names)), dtype=np.int64)
     
     def analyze_log_entry(self, log_entry: Dict[str, Any]) -> Dict[str, Any]:
         """Analisa uma entrada de log individual"""
         message = log_entry.get('message', '').lower()
         service = log_entry.get('service', 'unknown')
-        timestamp = log_entry.get('timestamp', datetime.now().isoformat())
+        timestamp = log_entry['timestamp'] if 'timestamp' in log_entry else self._now_iso()
         
         analysis = {
             'timestamp': timestamp,
             'service': service,
             'original_message': log_entry.get('message', ''),
             'patterns_detected': [],
+            'patterns_mask': 0,
             'severity': self._determine_severity(message),
             'bug_probability': 0.0,
             'recommendations': []
         }
         
         # Detectar padrões de erro
-        for pattern_name, pattern_regex in self.error_patterns.items():
-            if re.search(pattern_regex, message, re.IGNORECASE):
-                analysis['patterns_detected'].append(pattern_name)
-                self.pattern_frequency[pattern_name] += 1
-                self.service_patterns[service][pattern_name] += 1
+        for pattern_name in self._match_patterns(message):
+            analysis['patterns_detected'].append(pattern_name)
+            self.pattern_frequency[pattern_name] += 1
+        if analysis['patterns_detected']:
+            service_row = self._service_row(service)
+            counts_row = self._service_pattern_counts[service_row]
+            for pattern_name in analysis['patterns_detected']:
+                pattern_id = self._pattern_index[pattern_name]
+                counts_row[pattern_id] += 1
+                analysis['patterns_mask'] |= 1 << pattern_id
         
         # Calcular probabilidade de bug
         analysis['bug_probability'] = self._calculate_bug_probability(analysis)
@@ -77,14 +195,433 @@ class BugPatternAnalyzer:
         analysis['recommendations'] = self._generate_recommendations(analysis)
         
         # Adicionar ao histórico
-        self.bug_history.append(analysis)
+        self._record_analysis(analysis)
         
         return analysis
     
+    def analyze_batch(self, log_entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Analisa um lote de entradas de log de forma vetorizada.
+        
+        Produz o mesmo resultado que chamar analyze_log_entry para cada entrada,
+        mas a detecção de padrões e o cálculo de probabilidade rodam por coluna.
+        Com Hyperscan disponível os dois caminhos usam o banco compilado; sem ele,
+        ambos usam os literais e regex de _split_pattern.
+        """
+        if not log_entries:
+            return []
+        
+        original_messages = [entry.get('message', '') for entry in log_entries]
+        messages = pd.Series(original_messages, dtype=object).str.lower()
+        
+        # Matriz (entradas x padrões) de detecções, pelo mesmo motor de _match_patterns
+        if self._hs_db is not None:
+            hits = self._hyperscan_hits(messages)
+        else:
+            has_pattern, has_pattern_linear = self._has_pattern, self._has_pattern_linear
+            hits = np.column_stack([
+                np.fromiter((
+                    has_pattern(m, *matcher) if len(m) <= BACKTRACK_SAFE_CHARS else has_pattern_linear(m, *linear)
+                    for m in messages
+                ), dtype=bool, count=len(messages))
+                for matcher, linear in zip(self._pattern_matchers.values(), self._linear_matchers.values())
+            ])
+        severities = [self._determine_severity(message) for message in messages]
+        
+        masks = hits.astype(np.int64) @ self._pattern_bit_values
+        if self._probability_table is not None:
+            probabilities = self._probability_table[[self._severity_rows[s] for s in severities], masks]
+        else:
+            # Soma na mesma ordem de _traditional_probability para manter os mesmos floats
+            probabilities = np.array([self.severity_weights.get(s, 0.1) for s in severities])
+            for column, pattern_name in enumerate(self._pattern_names):
+                probabilities += hits[:, column] * self.pattern_weights.get(pattern_name, 0.2)
+            probabilities = np.minimum(probabilities, 1.0)
+        
+        if self.model_trained and self.ml_model:
+            probabilities = probabilities * 0.4 + self._ml_probability_batch(severities, hits, original_messages) * 0.6
+        
+        analyses = []
+        hit_entries = []
+        service_rows = []
+        for row, entry in enumerate(log_entries):
+            service = entry.get('service', 'unknown')
+            patterns_detected = [self._pattern_names[i] for i in np.flatnonzero(hits[row])]
+            for pattern_name in patterns_detected:
+                self.pattern_frequency[pattern_name] += 1
+            if patterns_detected:
+                hit_entries.append(row)
+                service_rows.append(self._service_row(service))
+            
+            analysis = {
+                'timestamp': entry['timestamp'] if 'timestamp' in entry else self._now_iso(),
+                'service': service,
+                'original_message': original_messages[row],
+                'patterns_detected': patterns_detected,
+                'patterns_mask': int(masks[row]),
+                'severity': severities[row],
+                'bug_probability': float(probabilities[row]),
+                'recommendations': []
+            }
+            analysis['recommendations'] = self._generate_recommendations(analysis)
+            self._record_analysis(analysis)
+            analyses.append(analysis)
+        
+        np.add.at(self._service_pattern_counts, service_rows, hits[hit_entries])
+        return analyses
+    
+    def _hyperscan_hits(self, messages: List[str]) -> np.ndarray:
+        """Matriz (entradas x padrões) de detecções com uma varredura Hyperscan por mensagem"""
+        hits = np.zeros((len(messages), len(self._pattern_names)), dtype=bool)
+        
+        def on_match(pattern_id, start, end, flags, row):
+            hits[row, pattern_id] = True
+        
+        for row, message in enumerate(messages):
+            self._hs_db.scan(message.encode(), match_event_handler=on_match, context=row)
+        return hits
+    
+    def analyze_many(self, log_entries: List[Dict[str, Any]], n_jobs: int = -1,
+                     min_shard_size: int = 20000) -> List[Dict[str, Any]]:
+        """Analisa grandes volumes de logs dividindo o trabalho entre processos.
+        
+        Cada processo roda analyze_batch num analisador próprio (com a mesma
+        configuração e o mesmo modelo ML); os resultados voltam em ordem e são agregados aqui.
+        Lotes pequenos demais para compensar o custo de IPC usam analyze_batch.
+        """
+        shard_count = min(effective_n_jobs(n_jobs), len(log_entries) // min_shard_size)
+        if shard_count <= 1:
+            return self.analyze_batch(log_entries)
+        
+        shard_size = -(-len(log_entries) // shard_count)
+        shards = [log_entries[i:i + shard_size] for i in range(0, len(log_entries), shard_size)]
+        config = {name: getattr(self, name) for name in CONFIG_ATTRIBUTES}
+        results = Parallel(n_jobs=shard_count)(
+            delayed(_analyze_shard)(shard, self.bug_history.maxlen, config,
+                                    self.anomaly_detector, self.model_trained, self.ml_model)
+            for shard in shards
+        )
+        
+        analyses = []
+        for shard_analyses in results:
+            for analysis in shard_analyses:
+                for pattern_name in analysis['patterns_detected']:
+                    self.pattern_frequency[pattern_name] += 1
+                if analysis['patterns_detected']:
+                    service_row = self._service_row(analysis['service'])
+                    counts_row = self._service_pattern_counts[service_row]
+                    for pattern_name in analysis['patterns_detected']:
+                        counts_row[self._pattern_index[pattern_name]] += 1
+                self._record_analysis(analysis)
+                analyses.append(analysis)
+        
+        return analyses
+    
+    def _ml_probability_batch(self, severities: List[str], hits: np.ndarray,
+                              messages: List[str]) -> np.ndarray:
+        """Versão vetorizada de _ml_probability para analyze_batch"""
+        try:
+            features = np.column_stack([
+                [self.severity_scores.get(s, 1) for s in severities],
+                hits.sum(axis=1),
+                hits,
+                [min(len(m) / 1000, 1.0) for m in messages]
+            ])
+            # decision_function ignora n_jobs do estimador: o paralelismo entre
+            # árvores só vale com o backend threading explícito e lotes grandes
+            if len(features) >= PARALLEL_SCORING_MIN_ROWS:
+                with parallel_backend('threading', n_jobs=-1):
+                    anomaly_scores = self.anomaly_detector.decision_function(features)
+            else:
+                anomaly_scores = self.anomaly_detector.decision_function(features)
+            return np.clip((anomaly_scores + 0.5) * 2, 0, 1)
+        except Exception:
+            return np.full(len(severities), 0.5)
+    
+    @property
+    def vectorizer(self) -> TfidfVectorizer:
+        """Vetorizador TF-IDF, criado sob demanda (a análise de logs não o usa)"""
+        if self._vectorizer is None:
+            self._vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
+        return self._vectorizer
+    
+    @vectorizer.setter
+    def vectorizer(self, vectorizer: TfidfVectorizer):
+        self._vectorizer = vectorizer
+    
+    @property
+    def service_patterns(self) -> Dict[str, Counter]:
+        """Contagem de padrões por serviço, montada a partir da matriz serviço x padrão"""
+        return {
+            service: Counter({
+                name: int(count)
+                for name, count in zip(self._pattern_names, self._service_pattern_counts[row])
+                if count
+            })
+            for service, row in self._service_index.items()
+        }
+    
+    def _service_row(self, service: str) -> int:
+        """Linha do serviço na matriz, dobrando a matriz quando ela enche"""
+        row = self._service_index.get(service)
+        if row is None:
+            row = len(self._service_index)
+            if row == len(self._service_pattern_counts):
+                self._service_pattern_counts = np.vstack([
+                    self._service_pattern_counts, np.zeros_like(self._service_pattern_counts)
+                ])
+            self._service_index[service] = row
+        return row
+    
+    def _record_analysis(self, analysis: Dict[str, Any]):
+        """Adiciona a análise ao histórico e atualiza os agregados dos relatórios"""
+        self._analysis_count += 1
+        message = analysis['original_message']
+        if len(message) > HISTORY_MESSAGE_CHARS:
+            analysis = {**analysis, 'original_message': message[:HISTORY_MESSAGE_CHARS],
+                        'message_length': len(message)}
+        
+        if len(self.bug_history) == self.bug_history.maxlen:
+            self._forget_analysis(self.bug_history[0], self._history_hours[0])
+        self.bug_history.append(analysis)
+        self.severity_counter[analysis['severity']] += 1
+        
+        probability = analysis['bug_probability']
+        if probability > 0.7:
+            self.high_prob_count += 1
+        if probability > 0.5:
+            self.service_high_prob[analysis['service']] += 1
+        
+        severity_score = self.severity_scores.get(analysis['severity'], 1)
+        for pattern in analysis['patterns_detected']:
+            self.pattern_entry_count[pattern] += 1
+            self.pattern_severity_total[pattern] += severity_score
+        
+        timestamp = self._parse_timestamp(analysis['timestamp'])
+        self._history_hours.append(-1 if timestamp is None else timestamp.hour)
+        if timestamp is not None:
+            self.hourly_counts[timestamp.hour] += 1
+            # Timestamps com fuso não são comparáveis com datetime.now() e nunca
+            # contam como recentes
+            if timestamp.tzinfo is None and timestamp > self._now() - timedelta(hours=24):
+                self._recent_entries.append((timestamp, analysis))
+    
+    def _forget_analysis(self, analysis: Dict[str, Any], hour: int):
+        """Remove dos agregados a análise que está saindo do histórico"""
+        self._decrement(self.severity_counter, analysis['severity'])
+        
+        probability = analysis['bug_probability']
+        if probability > 0.7:
+            self.high_prob_count -= 1
+        if probability > 0.5:
+            self._decrement(self.service_high_prob, analysis['service'])
+        
+        severity_score = self.severity_scores.get(analysis['severity'], 1)
+        for pattern in analysis['patterns_detected']:
+            self._decrement(self.pattern_frequency, pattern)
+            self._decrement(self.pattern_entry_count, pattern)
+            self._decrement(self.pattern_severity_total, pattern, severity_score)
+        
+        if hour >= 0:
+            self.hourly_counts[hour] -= 1
+        
+        # A análise mais antiga do histórico é também a mais antiga da janela recente
+        if self._recent_entries and self._recent_entries[0][1] is analysis:
+            self._recent_entries.popleft()
+    
+    @staticmethod
+    def _decrement(counter: Counter, key, amount: int = 1):
+        """Decrementa um contador, removendo a chave ao chegar a zero"""
+        counter[key] -= amount
+        if counter[key] <= 0:
+            del counter[key]
+    
+    def _now(self) -> datetime:
+        """datetime.now() relido no máximo uma vez por segundo no caminho quente"""
+        tick = time.monotonic()
+        if tick - self._clock_tick >= 1.0:
+            self._clock_tick = tick
+            self._clock_now = datetime.now()
+            self._clock_iso = self._clock_now.isoformat()
+        return self._clock_now
+    
+    def _now_iso(self) -> str:
+        """Timestamp ISO padrão para entradas sem timestamp (precisão de ~1s)"""
+        self._now()
+        return self._clock_iso
+    
+    def _history_feature_matrix(self) -> np.ndarray:
+        """Matriz de features (float32) de todo o histórico, na ordem do histórico.
+        
+        Equivale a empilhar _extract_ml_features de cada entrada; só as análises
+        registradas desde a última chamada são extraídas.
+        """
+        history = self.bug_history
+        count = self._analysis_count
+        capacity = 0 if self._history_features is None else len(self._history_features)
+        if self._history_features is None or (count > capacity and capacity != history.maxlen):
+            # O buffer dobra até history_size (sem teto se None). Enquanto cresce o
+            # anel ainda não deu a volta, então as linhas copiadas mantêm a posição
+            grown_capacity = max(count, 2 * capacity, 1)
+            if history.maxlen is not None:
+                grown_capacity = min(grown_capacity, history.maxlen)
+            grown = np.zeros((grown_capacity, len(self._pattern_names) + 3), dtype=np.float32)
+            if capacity:
+                grown[:capacity] = self._history_features
+            self._history_features = grown
+            capacity = grown_capacity
+        
+        pending = min(count - self._features_filled, len(history))
+        if pending:
+            new_entries = list(islice(history, len(history) - pending, None))
+            slots = np.arange(self._analysis_count - pending, self._analysis_count) % capacity
+            self._history_features[slots] = self._features_matrix(new_entries)
+            self._features_filled = self._analysis_count
+        
+        first = self._analysis_count - len(history)
+        return self._history_features[np.arange(first, self._analysis_count) % capacity]
+    
+    def _features_matrix(self, entries: List[Dict[str, Any]]) -> np.ndarray:
+        """Versão vetorizada de _extract_ml_features para várias análises"""
+        features = np.zeros((len(entries), len(self._pattern_names) + 3), dtype=np.float32)
+        features[:, 0] = [self.severity_scores.get(e['severity'], 1) for e in entries]
+        features[:, 1] = [len(e['patterns_detected']) for e in entries]
+        
+        features[:, 2:-1] = self._unpack_pattern_masks([e['patterns_mask'] for e in entries])
+        
+        message_lengths = np.array([
+            e.get('message_length', len(e.get('original_message', ''))) for e in entries
+        ], dtype=np.float32)
+        features[:, -1] = np.minimum(message_lengths / 1000, 1.0)
+        return features
+    
+    def _recent_analyses(self, hours: int = 24) -> List[Dict[str, Any]]:
+        """Análises com timestamp nas últimas `hours` horas (no máximo 24)"""
+        now = datetime.now()
+        day_cutoff = now - timedelta(hours=24)
+        recent_entries = self._recent_entries
+        while recent_entries and recent_entries[0][0] <= day_cutoff:
+            recent_entries.popleft()
+        
+        cutoff = now - timedelta(hours=hours)
+        return [analysis for timestamp, analysis in recent_entries if timestamp > cutoff]
+    
+    def _build_hyperscan_db(self):
+        """Compila todos os padrões num único banco Hyperscan (DFA multi-padrão)"""
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[p.encode() for p in self.error_patterns.values()],
+                ids=list(range(len(self._pattern_names))),
+                flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(self._pattern_names)
+            )
+            return db
+        except Exception:
+            return None
+    
+    def _match_patterns(self, message: str) -> List[str]:
+        """Retorna os padrões de erro presentes na mensagem, na ordem de error_patterns"""
+        if self._hs_db is not None:
+            matched_ids = set()
+            
+            def on_match(pattern_id, start, end, flags, context):
+                matched_ids.add(pattern_id)
+            
+            self._hs_db.scan(message.encode(), match_event_handler=on_match)
+            return [self._pattern_names[i] for i in sorted(matched_ids)]
+        
+        if len(message) > BACKTRACK_SAFE_CHARS:
+            return [
+                pattern_name for pattern_name, linear in self._linear_matchers.items()
+                if self._has_pattern_linear(message, *linear)
+            ]
+        
+        detected = []
+        for pattern_name, (literals, regex) in self._pattern_matchers.items():
+            if self._has_pattern(message, literals, regex):
+                detected.append(pattern_name)
+        return detected
+    
+    @staticmethod
+    def _has_pattern(message: str, literals: Tuple[str, ...], regex: Optional[re.Pattern]) -> bool:
+        """Testa um padrão já separado por _split_pattern numa mensagem em minúsculas"""
+        for literal in literals:
+            if literal in message:
+                return True
+        return regex is not None and regex.search(message) is not None
+    
+    @staticmethod
+    def _has_pattern_linear(message: str, literals: Tuple[str, ...], chains: Tuple[Tuple[str, ...], ...],
+                            regex: Optional[re.Pattern]) -> bool:
+        """Versão de _has_pattern para mensagens longas, sem backtracking em 'a.*b'.
+        
+        Com regex, 'null null null ...' faz 'null.*pointer' reiniciar a varredura
+        a cada ocorrência de 'null' (quadrático); a busca sequencial é linear.
+        """
+        for literal in literals:
+            if literal in message:
+                return True
+        if chains:
+            lines = message.split('\n') if '\n' in message else (message,)  # '.' não casa com '\n'
+            for segments in chains:
+                for line in lines:
+                    if BugPatternAnalyzer._contains_in_order(line, segments):
+                        return True
+        return regex is not None and regex.search(message) is not None
+    
+    @staticmethod
+    def _contains_in_order(line: str, segments: Tuple[str, ...]) -> bool:
+        """Equivale a re.search('seg1.*seg2.*...') numa linha, em tempo linear.
+        
+        Basta a primeira ocorrência de cada segmento: ela termina o mais cedo
+        possível e deixa o maior trecho livre para os seguintes.
+        """
+        position = 0
+        for segment in segments:
+            position = line.find(segment, position)
+            if position < 0:
+                return False
+            position += len(segment)
+        return True
+    
+    @staticmethod
+    def _split_chains(literals: Tuple[str, ...], regex: Optional[re.Pattern]
+                      ) -> Tuple[Tuple[str, ...], Tuple[Tuple[str, ...], ...], Optional[re.Pattern]]:
+        """Separa do regex de _split_pattern as alternativas 'a.*b' formadas só por literais"""
+        # Padrões com escapes (IGNORECASE) ou grupos aninhados ficam só no regex
+        if regex is None or regex.flags & re.IGNORECASE or '(' in regex.pattern:
+            return literals, (), regex
+        
+        chains, remaining = [], []
+        for alt in regex.pattern.split('|'):
+            segments = alt.split('.*')
+            if any(REGEX_METACHARS.search(segment) for segment in segments):
+                remaining.append(alt)
+            else:
+                chains.append(tuple(segments))
+        return literals, tuple(chains), re.compile('|'.join(remaining)) if remaining else None
+    
+    @staticmethod
+    def _split_pattern(pattern: str) -> Tuple[Tuple[str, ...], Optional[re.Pattern]]:
+        """Separa as alternativas literais de um padrão '(a|b|c)' das que exigem regex"""
+        # A mensagem já chega em minúsculas: sem escapes (\S, \W, ...) o padrão
+        # pode ser rebaixado uma vez e compilado sem IGNORECASE, que é bem mais lento
+        if '\\' in pattern:
+            return (), re.compile(pattern, re.IGNORECASE)
+        
+        pattern = pattern.lower()
+        group = re.fullmatch(r'\(([^()]*)\)', pattern)
+        if group is None:
+            return (), re.compile(pattern)
+        
+        alternatives = group.group(1).split('|')
+        literals = tuple(alt for alt in alternatives if not REGEX_METACHARS.search(alt))
+        remaining = [alt for alt in alternatives if alt not in literals]
+        return literals, re.compile('|'.join(remaining)) if remaining else None
+    
     def _determine_severity(self, message: str) -> str:
         """Determina a severidade baseada no conteúdo da mensagem"""
-        for severity, keywords in self.severity_keywords.items():
-            if any(keyword in message for keyword in keywords):
+        for keyword, severity in self._severity_lookup:
+            if keyword in message:
                 return severity
         return 'LOW'
     
@@ -101,20 +638,41 @@ class BugPatternAnalyzer:
         
         return traditional_prob
     
+    def _build_probability_table(self) -> Tuple[Dict[str, int], Optional[np.ndarray]]:
+        """Tabela (severidade x bitmask) com o resultado de _traditional_probability.
+        
+        Cada célula soma os pesos na mesma ordem do cálculo direto, então os
+        floats são idênticos. Com muitos padrões a tabela não compensa (2^n colunas).
+        """
+        pattern_count = len(self._pattern_names)
+        if pattern_count > 10:
+            return {}, None
+        
+        severities = list(dict.fromkeys([*self.severity_keywords, 'LOW']))
+        pattern_weights = [self.pattern_weights.get(name, 0.2) for name in self._pattern_names]
+        table = np.empty((len(severities), 1 << pattern_count))
+        for row, severity in enumerate(severities):
+            for mask in range(1 << pattern_count):
+                probability = 0.0
+                probability += self.severity_weights.get(severity, 0.1)
+                for bit, weight in enumerate(pattern_weights):
+                    if mask >> bit & 1:
+                        probability += weight
+                table[row, mask] = min(probability, 1.0)
+        return {severity: row for row, severity in enumerate(severities)}, table
+    
     def _traditional_probability(self, analysis: Dict[str, Any]) -> float:
         """Método tradicional de cálculo"""
-        probability = 0.0
-        severity_weights = {'CRITICAL': 0.9, 'HIGH': 0.7, 'MEDIUM': 0.4, 'LOW': 0.1}
-        probability += severity_weights.get(analysis['severity'], 0.1)
+        row = self._severity_rows.get(analysis['severity'])
+        mask = analysis.get('patterns_mask')
+        if row is not None and mask is not None:
+            return self._probability_rows[row][mask]
         
-        pattern_weights = {
-            'connection_timeout': 0.6, 'null_pointer': 0.8, 'authentication_failure': 0.5,
-            'validation_error': 0.3, 'database_error': 0.7, 'memory_error': 0.9,
-            'network_error': 0.6, 'rate_limit': 0.4
-        }
+        probability = 0.0
+        probability += self.severity_weights.get(analysis['severity'], 0.1)
         
         for pattern in analysis['patterns_detected']:
-            probability += pattern_weights.get(pattern, 0.2)
+            probability += self.pattern_weights.get(pattern, 0.2)
         
         return min(probability, 1.0)
     
@@ -138,8 +696,7 @@ class BugPatternAnalyzer:
         features = []
         
         # Features categóricas
-        severity_map = {'CRITICAL': 4, 'HIGH': 3, 'MEDIUM': 2, 'LOW': 1}
-        features.append(severity_map.get(analysis['severity'], 1))
+        features.append(self.severity_scores.get(analysis['severity'], 1))
         
         # Número de padrões detectados
         features.append(len(analysis['patterns_detected']))
@@ -150,7 +707,7 @@ class BugPatternAnalyzer:
             features.append(1 if pattern in analysis['patterns_detected'] else 0)
         
         # Comprimento da mensagem (normalizado)
-        msg_len = len(analysis.get('original_message', ''))
+        msg_len = analysis.get('message_length', len(analysis.get('original_message', '')))
         features.append(min(msg_len / 1000, 1.0))
         
         return features
@@ -180,6 +737,7 @@ class BugPatternAnalyzer:
             # Salvar modelo
             self._save_model()
             self.model_trained = True
+            self._report_cache = None
             
             return {
                 'success': True,
@@ -208,49 +766,47 @@ class BugPatternAnalyzer:
             model_dir = 'models'
             os.makedirs(model_dir, exist_ok=True)
             
-            with open(f'{model_dir}/anomaly_detector.pkl', 'wb') as f:
-                pickle.dump(self.anomaly_detector, f)
-                
-            with open(f'{model_dir}/vectorizer.pkl', 'wb') as f:
-                pickle.dump(self.vectorizer, f)
+            joblib.dump(self.anomaly_detector, f'{model_dir}/anomaly_detector.joblib', compress=3)
+            if self._vectorizer is not None:
+                joblib.dump(self._vectorizer, f'{model_dir}/vectorizer.joblib', compress=3)
         except Exception:
             pass
     
     def load_model(self) -> bool:
         """Carrega modelo salvo"""
         try:
-            with open('models/anomaly_detector.pkl', 'rb') as f:
-                self.anomaly_detector = pickle.load(f)
-                
-            with open('models/vectorizer.pkl', 'rb') as f:
-                self.vectorizer = pickle.load(f)
-                
+            self.anomaly_detector = self._load_artifact('anomaly_detector')
+            try:
+                self.vectorizer = self._load_artifact('vectorizer')
+            except FileNotFoundError:
+                self._vectorizer = None  # Modelo salvo sem vetorizador em uso
+            
             self.model_trained = True
+            self._report_cache = None
             return True
         except Exception:
             return False
     
+    def _load_artifact(self, name: str) -> Any:
+        """Carrega artefato salvo, preferindo o arquivo mais recente entre .joblib e .pkl legado"""
+        candidates = [path for path in (f'models/{name}.joblib', f'models/{name}.pkl') if os.path.exists(path)]
+        if not candidates:
+            raise FileNotFoundError(f'models/{name}')
+        
+        path = max(candidates, key=os.path.getmtime)
+        if path.endswith('.joblib'):
+            return joblib.load(path)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    
     def _generate_recommendations(self, analysis: Dict[str, Any]) -> List[str]:
         """Gera recomendações baseadas nos padrões detectados"""
-        recommendations = []
-        
-        for pattern in analysis['patterns_detected']:
-            if pattern == 'connection_timeout':
-                recommendations.append("Increase timeout values and implement retry logic")
-            elif pattern == 'null_pointer':
-                recommendations.append("Add null checks and defensive programming")
-            elif pattern == 'authentication_failure':
-                recommendations.append("Review authentication logic and token validation")
-            elif pattern == 'validation_error':
-                recommendations.append("Strengthen input validation and error messages")
-            elif pattern == 'database_error':
-                recommendations.append("Check database connectivity and query optimization")
-            elif pattern == 'memory_error':
-                recommendations.append("Investigate memory leaks and optimize resource usage")
-            elif pattern == 'network_error':
-                recommendations.append("Implement circuit breaker and network resilience")
-            elif pattern == 'rate_limit':
-                recommendations.append("Implement backoff strategy and rate limiting")
+        pattern_recommendations = self.pattern_recommendations
+        recommendations = [
+            pattern_recommendations[pattern]
+            for pattern in analysis['patterns_detected']
+            if pattern in pattern_recommendations
+        ]
         
         if analysis['bug_probability'] > 0.7:
             recommendations.append("HIGH PRIORITY: Investigate immediately")
@@ -264,9 +820,15 @@ class BugPatternAnalyzer:
         if not self.bug_history:
             return {'error': 'No data analyzed yet'}
         
+        # Polls repetidos sem novas análises reaproveitam o último relatório
+        now = time.monotonic()
+        if self._report_cache is not None:
+            analysis_count, built_at, cached_report = self._report_cache
+            if analysis_count == self._analysis_count and now - built_at < REPORT_CACHE_TTL:
+                return cached_report
+        
         # Estatísticas básicas
         total_entries = len(self.bug_history)
-        high_probability_bugs = [b for b in self.bug_history if b['bug_probability'] > 0.7]
         top_patterns = self.pattern_frequency.most_common(5)
         
         # ML-powered clustering
@@ -281,8 +843,8 @@ class BugPatternAnalyzer:
         report = {
             'summary': {
                 'total_log_entries': total_entries,
-                'high_probability_bugs': len(high_probability_bugs),
-                'bug_detection_rate': len(high_probability_bugs) / total_entries if total_entries > 0 else 0,
+                'high_probability_bugs': self.high_prob_count,
+                'bug_detection_rate': self.high_prob_count / total_entries if total_entries > 0 else 0,
                 'ml_model_active': self.model_trained,
                 'accuracy_score': self._get_model_accuracy()
             },
@@ -301,6 +863,7 @@ class BugPatternAnalyzer:
             'real_time_alerts': self._generate_real_time_alerts()
         }
         
+        self._report_cache = (self._analysis_count, now, report)
         return report
     
     def _cluster_similar_bugs(self) -> List[Dict[str, Any]]:
@@ -308,13 +871,15 @@ class BugPatternAnalyzer:
         if len(self.bug_history) < 5:
             return []
         
+        # O relatório e as recomendações de ML pedem os clusters do mesmo histórico
+        if self._cluster_cache is not None and self._cluster_cache[0] == self._analysis_count:
+            return self._cluster_cache[1]
+        
         try:
+            history = list(self.bug_history)
+            
             # Extrair features para clustering
-            features = []
-            for entry in self.bug_history:
-                feature_vector = self._extract_ml_features(entry)
-                if feature_vector:
-                    features.append(feature_vector)
+            features = self._history_feature_matrix()
             
             if len(features) < 3:
                 return []
@@ -327,16 +892,17 @@ class BugPatternAnalyzer:
             # Agrupar resultados
             cluster_info = []
             for i in range(n_clusters):
-                cluster_bugs = [self.bug_history[j] for j, c in enumerate(clusters) if c == i]
+                cluster_bugs = [history[j] for j, c in enumerate(clusters) if c == i]
                 if cluster_bugs:
                     cluster_info.append({
                         'cluster_id': i,
                         'size': len(cluster_bugs),
-                        'avg_probability': np.mean([b['bug_probability'] for b in cluster_bugs]),
+                        'avg_probability': sum(b['bug_probability'] for b in cluster_bugs) / len(cluster_bugs),
                         'common_patterns': self._get_cluster_patterns(cluster_bugs),
                         'services_affected': list(set(b['service'] for b in cluster_bugs))
                     })
             
+            self._cluster_cache = (self._analysis_count, cluster_info)
             return cluster_info
             
         except Exception:
@@ -349,18 +915,17 @@ class BugPatternAnalyzer:
         
         try:
             anomalies = []
-            for entry in self.bug_history[-20:]:  # Últimas 20 entradas
-                features = self._extract_ml_features(entry)
-                if features:
-                    anomaly_score = self.anomaly_detector.decision_function([features])[0]
-                    if anomaly_score < -0.3:  # Threshold para anomalia
-                        anomalies.append({
-                            'timestamp': entry['timestamp'],
-                            'service': entry['service'],
-                            'anomaly_score': float(anomaly_score),
-                            'patterns': entry['patterns_detected'],
-                            'message_preview': entry['original_message'][:100]
-                        })
+            start = max(len(self.bug_history) - 20, 0)  # Últimas 20 entradas
+            anomaly_scores = self.anomaly_detector.decision_function(self._history_feature_matrix()[start:])
+            for entry, anomaly_score in zip(islice(self.bug_history, start, None), anomaly_scores):
+                if anomaly_score < -0.3:  # Threshold para anomalia
+                    anomalies.append({
+                        'timestamp': entry['timestamp'],
+                        'service': entry['service'],
+                        'anomaly_score': float(anomaly_score),
+                        'patterns': entry['patterns_detected'],
+                        'message_preview': entry['original_message'][:100]
+                    })
             
             return sorted(anomalies, key=lambda x: x['anomaly_score'])[:5]
             
@@ -373,8 +938,8 @@ class BugPatternAnalyzer:
             return {'error': 'Insufficient data for prediction'}
         
         # Análise temporal simples
-        recent_24h = len([b for b in self.bug_history if self._is_recent(b['timestamp'], 24)])
-        recent_1h = len([b for b in self.bug_history if self._is_recent(b['timestamp'], 1)])
+        recent_24h = len(self._recent_analyses(24))
+        recent_1h = len(self._recent_analyses(1))
         
         # Calcular tendência
         if recent_1h > 0:
@@ -396,25 +961,14 @@ class BugPatternAnalyzer:
         if len(self.bug_history) < 5:
             return 0.0
         
-        # Analisar variabilidade histórica
-        hourly_counts = defaultdict(int)
-        for entry in self.bug_history:
-            try:
-                hour = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00')).hour
-                hourly_counts[hour] += 1
-            except:
-                continue
-        
-        if not hourly_counts:
-            return 0.0
-        
-        counts = list(hourly_counts.values())
+        # Analisar variabilidade histórica (só horas com alguma entrada)
+        counts = [count for count in self.hourly_counts.tolist() if count > 0]
         if len(counts) < 2:
             return 0.0
         
-        # Usar desvio padrão como indicador de volatilidade
-        std_dev = np.std(counts)
-        mean_count = np.mean(counts)
+        # Usar desvio padrão como indicador de volatilidade (no máximo 24 valores: aritmética direta)
+        mean_count = sum(counts) / len(counts)
+        std_dev = (sum((count - mean_count) ** 2 for count in counts) / len(counts)) ** 0.5
         
         # Probabilidade baseada na volatilidade
         volatility = std_dev / (mean_count + 1)
@@ -429,7 +983,7 @@ class BugPatternAnalyzer:
         if not self.bug_history:
             return 'UNKNOWN'
         
-        recent_bugs = [b for b in self.bug_history if self._is_recent(b['timestamp'], 24)]
+        recent_bugs = self._recent_analyses(24)
         high_prob_recent = [b for b in recent_bugs if b['bug_probability'] > 0.7]
         
         risk_ratio = len(high_prob_recent) / max(len(recent_bugs), 1)
@@ -445,22 +999,23 @@ class BugPatternAnalyzer:
     
     def _get_pattern_severity(self, pattern: str) -> float:
         """Calcula severidade média de um padrão"""
-        pattern_entries = [e for e in self.bug_history if pattern in e['patterns_detected']]
-        if not pattern_entries:
+        entry_count = self.pattern_entry_count[pattern]
+        if not entry_count:
             return 0.0
         
-        severity_scores = {'CRITICAL': 4, 'HIGH': 3, 'MEDIUM': 2, 'LOW': 1}
-        scores = [severity_scores.get(e['severity'], 1) for e in pattern_entries]
-        return np.mean(scores) if scores else 0.0
+        return self.pattern_severity_total[pattern] / entry_count
     
     def _get_cluster_patterns(self, cluster_bugs: List[Dict]) -> List[str]:
         """Extrai padrões comuns de um cluster"""
-        all_patterns = []
-        for bug in cluster_bugs:
-            all_patterns.extend(bug['patterns_detected'])
-        
-        pattern_counts = Counter(all_patterns)
-        return [pattern for pattern, count in pattern_counts.most_common(3)]
+        pattern_counts = self._unpack_pattern_masks([bug['patterns_mask'] for bug in cluster_bugs]).sum(axis=0)
+        # Empates ficam na ordem de declaração de error_patterns
+        top = np.argsort(-pattern_counts, kind='stable')[:3]
+        return [self._pattern_names[i] for i in top if pattern_counts[i] > 0]
+    
+    def _unpack_pattern_masks(self, masks: List[int]) -> np.ndarray:
+        """Expande bitmasks de padrões numa matriz 0/1 (entradas x padrões)"""
+        masks = np.asarray(masks, dtype=np.int64)
+        return (masks[:, np.newaxis] & self._pattern_bit_values) != 0
     
     def _get_ml_recommendations(self) -> List[Dict[str, str]]:
         """Gera recomendações baseadas em ML"""
@@ -491,7 +1046,7 @@ class BugPatternAnalyzer:
         alerts = []
         
         # Alert para picos recentes
-        recent_1h = [b for b in self.bug_history if self._is_recent(b['timestamp'], 1)]
+        recent_1h = self._recent_analyses(1)
         if len(recent_1h) > 5:
             alerts.append({
                 'type': 'SPIKE_DETECTED',
@@ -518,21 +1073,16 @@ class BugPatternAnalyzer:
         
         return alerts
     
-    def _is_recent(self, timestamp_str: str, hours: int = 24) -> bool:
-        """Verifica se timestamp é recente"""
+    def _parse_timestamp(self, timestamp_str: str):
+        """Converte timestamp ISO em datetime, ou None se inválido"""
         try:
-            timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-            cutoff = datetime.now() - timedelta(hours=hours)
-            return timestamp > cutoff
+            return _parse_iso_timestamp(timestamp_str)
         except:
-            return False
+            return None
     
     def _get_severity_distribution(self) -> Dict[str, int]:
         """Calcula distribuição de severidade"""
-        distribution = Counter()
-        for entry in self.bug_history:
-            distribution[entry['severity']] += 1
-        return dict(distribution)
+        return dict(self.severity_counter)
     
     def _get_global_recommendations(self) -> List[str]:
         """Gera recomendações globais baseadas em todos os dados"""
@@ -544,18 +1094,13 @@ class BugPatternAnalyzer:
             recommendations.append(f"Focus on {most_common[0]} issues - {most_common[1]} occurrences")
         
         # Serviços problemáticos
-        service_issues = defaultdict(int)
-        for entry in self.bug_history:
-            if entry['bug_probability'] > 0.5:
-                service_issues[entry['service']] += 1
-        
-        if service_issues:
-            worst_service = max(service_issues.items(), key=lambda x: x[1])
+        if self.service_high_prob:
+            worst_service = max(self.service_high_prob.items(), key=lambda x: x[1])
             recommendations.append(f"Priority service for improvement: {worst_service[0]}")
         
         # Taxa de bugs alta
         if self.bug_history:  # Prevent division by zero
-            high_prob_rate = len([b for b in self.bug_history if b['bug_probability'] > 0.7]) / len(self.bug_history)
+            high_prob_rate = self.high_prob_count / len(self.bug_history)
             if high_prob_rate > 0.1:
                 recommendations.append("High bug detection rate - consider code review and testing improvements")
         
@@ -567,8 +1112,8 @@ class BugPatternAnalyzer:
             return {'error': 'Insufficient data for prediction'}
         
         # Análise de tendências
-        recent_24h = [b for b in self.bug_history if self._is_recent(b['timestamp'], 24)]
-        recent_1h = [b for b in self.bug_history if self._is_recent(b['timestamp'], 1)]
+        recent_24h = self._recent_analyses(24)
+        recent_1h = self._recent_analyses(1)
         
         predictions = {
             'risk_level': 'LOW',
@@ -608,6 +1153,20 @@ class BugPatternAnalyzer:
             'last_training': datetime.now().isoformat() if self.model_trained else None
         }
 
+def _analyze_shard(log_entries: List[Dict[str, Any]], history_size: Optional[int],
+                   config: Dict[str, Any], anomaly_detector: IsolationForest,
+                   model_trained: bool, ml_model: Any) -> List[Dict[str, Any]]:
+    """Worker de analyze_many: analisa um pedaço dos logs num analisador local"""
+    analyzer = BugPatternAnalyzer(history_size)
+    # Mesma configuração do analisador pai
+    for name, value in config.items():
+        setattr(analyzer, name, value)
+    analyzer._compile_config()
+    analyzer.anomaly_detector = anomaly_detector
+    analyzer.model_trained = model_trained
+    analyzer.ml_model = ml_model
+    return analyzer.analyze_batch(log_entries)
+
 def main():
     """Exemplo avançado do Bug Pattern Analyzer com ML"""
     analyzer = BugPatternAnalyzer()
@@ -631,8 +1190,7 @@ def main():
     ]
     
     print("Analyzing logs with enhanced ML capabilities...")
-    for log in sample_logs:
-        analysis = analyzer.analyze_log_entry(log)
+    for analysis in analyzer.analyze_batch(sample_logs):
         print(f"Service: {analysis['service']} | Probability: {analysis['bug_probability']:.3f} | Patterns: {analysis['patterns_detected']}")
     
     # Gerar relatório avançado
@@ -6,15 +6,39 @@ Demonstra integração completa dos componentes ML aprimorados
 
 import sys
 import os
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from test_case_generator import AITestCaseGenerator
 from bug_pattern_analyzer import BugPatternAnalyzer
 from smart_test_prioritizer import SmartTestPrioritizer, TestCase, BusinessImpact
-from advanced_ml_engine import AdvancedMLEngine, TestMetrics
+from advanced_ml_engine import AdvancedMLEngine, TestMetrics, MLPrediction
+from typing import List, Dict, Any, Callable, Hashable, Optional, Tuple
 from datetime import datetime, timedelta
 import numpy as np
-import json
+import orjson
+
+PREDICTION_CACHE_SIZE = 1024  # Predições memoizadas por modelo
+
+class _ThreadRoutedStdout:
+    """sys.stdout que desvia a saída das threads de fase para o buffer de cada uma"""
+    
+    def __init__(self, target):
+        self.target = target
+        self.local = threading.local()
+    
+    def write(self, text: str) -> int:
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer if buffer is not None else self.target).write(text)
+    
+    def flush(self):
+        self.target.flush()
+    
+    def __getattr__(self, name: str):
+        # encoding, isatty(), fileno() etc. continuam vindo do stdout original
+        return getattr(self.target, name)
 
 class MLTestingSuite:
     """Suite integrada de ML para testing automation"""
@@ -24,6 +48,11 @@ class MLTestingSuite:
         self.bug_analyzer = BugPatternAnalyzer()
         self.test_prioritizer = SmartTestPrioritizer()
         self.ml_engine = AdvancedMLEngine()
+        # model_name -> ((modelo, versão), {features: predição}); testes inalterados
+        # entre execuções reaproveitam a predição sem chamar o modelo de novo
+        self._prediction_cache = {}
+        # path -> (mtime_ns, tamanho, análise): arquivos inalterados não são relidos
+        self._analysis_cache = {}
         
         # Carregar modelos existentes
         self._load_all_models()
@@ -64,30 +93,35 @@ class MLTestingSuite:
             'recommendations': []
         }
         
-        # 1. Geração de testes com IA
-        print("\n1️⃣ AI Test Generation")
-        test_gen_results = self._run_test_generation(project_path)
-        results['test_generation'] = test_gen_results
-        
-        # 2. Análise de padrões de bugs
-        print("\n2️⃣ Bug Pattern Analysis")
-        bug_analysis_results = self._run_bug_analysis()
-        results['bug_analysis'] = bug_analysis_results
-        
-        # 3. Priorização inteligente
-        print("\n3️⃣ Smart Test Prioritization")
-        priority_results = self._run_test_prioritization()
-        results['test_prioritization'] = priority_results
-        
-        # 4. Predição de falhas
-        print("\n4️⃣ Failure Prediction")
-        failure_results = self._run_failure_prediction()
-        results['failure_prediction'] = failure_results
+        phases = [
+            # 1. Geração de testes com IA
+            ('test_generation', "\n1️⃣ AI Test Generation", self._run_test_generation, (project_path,)),
+            # 2. Análise de padrões de bugs
+            ('bug_analysis', "\n2️⃣ Bug Pattern Analysis", self._run_bug_analysis, ()),
+            # 3. Priorização inteligente
+            ('test_prioritization', "\n3️⃣ Smart Test Prioritization", self._run_test_prioritization, ()),
+            # 4. Predição de falhas
+            ('failure_prediction', "\n4️⃣ Failure Prediction", self._run_failure_prediction, ()),
+            # 5. Análise de performance
+            ('performance_analysis', "\n5️⃣ Performance Analysis", self._run_performance_analysis, ()),
+        ]
         
-        # 5. Análise de performance
-        print("\n5️⃣ Performance Analysis")
-        performance_results = self._run_performance_analysis()
-        results['performance_analysis'] = performance_results
+        # As fases usam componentes independentes e passam a maior parte do tempo
+        # em NumPy/sklearn: rodam em paralelo, e a saída de cada uma é impressa
+        # inteira, na ordem original, assim que ela termina
+        router = _ThreadRoutedStdout(sys.stdout)
+        sys.stdout = router
+        try:
+            with ThreadPoolExecutor(max_workers=len(phases)) as executor:
+                futures = [
+                    (key, executor.submit(self._run_phase, router, header, run, args))
+                    for key, header, run, args in phases
+                ]
+                for key, future in futures:
+                    output, results[key] = future.result()
+                    router.target.write(output)
+        finally:
+            sys.stdout = router.target
         
         # 6. Gerar recomendações finais
         print("\n6️⃣ Generating ML Recommendations")
@@ -96,6 +130,16 @@ class MLTestingSuite:
         
         return results
     
+    def _run_phase(self, router: _ThreadRoutedStdout, header: str, run, args: tuple) -> Tuple[str, Dict[str, Any]]:
+        """Executa uma fase numa thread do pool, guardando o que ela imprime"""
+        buffer = router.local.buffer = io.StringIO()
+        try:
+            print(header)
+            result = run(*args)
+            return buffer.getvalue(), result
+        finally:
+            router.local.buffer = None
+    
     def _run_test_generation(self, project_path: str) -> Dict[str, Any]:
         """Executa geração de testes com IA"""
         try:
@@ -113,7 +157,7 @@ class MLTestingSuite:
                 print(f"   📁 Analyzing {service}...")
                 
                 # Análise do código (simulada se arquivo não existir)
-                analysis = self.test_generator.analyze_code_file(service)
+                analysis = self._analyze_code_file(service)
                 analysis_results.append(analysis)
                 
                 if 'error' not in analysis:
@@ -134,6 +178,23 @@ class MLTestingSuite:
         except Exception as e:
             return {'error': str(e), 'success': False}
     
+    def _analyze_code_file(self, file_path: str) -> Dict[str, Any]:
+        """analyze_code_file memoizado pelo mtime e tamanho do arquivo"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            # Arquivo ausente: o gerador devolve o erro de sempre
+            return self.test_generator.analyze_code_file(file_path)
+        
+        cached = self._analysis_cache.get(file_path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        
+        analysis = self.test_generator.analyze_code_file(file_path)
+        if 'error' not in analysis:
+            self._analysis_cache[file_path] = (stat.st_mtime_ns, stat.st_size, analysis)
+        return analysis
+    
     def _run_bug_analysis(self) -> Dict[str, Any]:
         """Executa análise de padrões de bugs"""
         try:
@@ -142,9 +203,8 @@ class MLTestingSuite:
             
             print(f"   📊 Analyzing {len(sample_logs)} log entries...")
             
-            # Analisar cada log
-            for log in sample_logs:
-                self.bug_analyzer.analyze_log_entry(log)
+            # Analisar todos os logs num único lote
+            self.bug_analyzer.analyze_batch(sample_logs)
             
             # Gerar relatório ML
             report = self.bug_analyzer.generate_pattern_report()
@@ -184,7 +244,8 @@ class MLTestingSuite:
             ml_metrics = self.test_prioritizer.get_ml_metrics()
             
             print(f"   🤖 ML Model Active: {ml_metrics['model_trained']}")
-            print(f"   📊 Top Priority Score: {max(p.priority_score for p in priorities):.3f}")
+            # Sem time_budget a lista já vem ordenada por score decrescente
+            print(f"   📊 Top Priority Score: {priorities[0].priority_score:.3f}")
             
             return {
                 'tests_prioritized': len(priorities),
@@ -213,10 +274,10 @@ class MLTestingSuite:
             
             predictions = []
             
-            print(f"   🔮 Predicting failures for {len(test_metrics)} tests...")
+            # Linhas acumuladas e escritas de uma vez no fim do laço
+            lines = [f"   🔮 Predicting failures for {len(test_metrics)} tests..."]
             
-            for metrics in test_metrics:
-                prediction = self.ml_engine.predict_test_failure(metrics)
+            for metrics, prediction in zip(test_metrics, self._predict_test_failures(test_metrics)):
                 predictions.append({
                     'test_name': metrics.test_name,
                     'failure_probability': prediction.prediction,
@@ -226,7 +287,9 @@ class MLTestingSuite:
                 })
                 
                 risk_level = "🔴 HIGH" if prediction.prediction > 0.7 else "🟡 MEDIUM" if prediction.prediction > 0.4 else "🟢 LOW"
-                print(f"   {risk_level} {metrics.test_name}: {prediction.prediction:.3f}")
+                lines.append(f"   {risk_level} {metrics.test_name}: {prediction.prediction:.3f}")
+            
+            sys.stdout.write('\n'.join(lines) + '\n')
             
             # Status dos modelos
             model_status = self.ml_engine.get_model_status()
@@ -254,10 +317,9 @@ class MLTestingSuite:
             
             performance_predictions = []
             
-            print(f"   ⚡ Analyzing performance for {len(test_characteristics)} tests...")
+            lines = [f"   ⚡ Analyzing performance for {len(test_characteristics)} tests..."]
             
-            for char in test_characteristics:
-                prediction = self.ml_engine.predict_execution_time(char)
+            for char, prediction in zip(test_characteristics, self._predict_execution_times(test_characteristics)):
                 performance_predictions.append({
                     'test_name': char['name'],
                     'predicted_time': prediction.prediction,
@@ -267,7 +329,9 @@ class MLTestingSuite:
                 })
                 
                 time_category = "🐌 SLOW" if prediction.prediction > 180 else "🚀 FAST" if prediction.prediction < 60 else "⚡ MEDIUM"
-                print(f"   {time_category} {char['name']}: {prediction.prediction:.1f}s")
+                lines.append(f"   {time_category} {char['name']}: {prediction.prediction:.1f}s")
+            
+            sys.stdout.write('\n'.join(lines) + '\n')
             
             return {
                 'performance_predictions': performance_predictions,
@@ -279,6 +343,54 @@ class MLTestingSuite:
         except Exception as e:
             return {'error': str(e), 'success': False}
     
+    def _predict_test_failures(self, test_metrics: List[TestMetrics]) -> List[MLPrediction]:
+        """predict_test_failure_batch memoizado pelos campos que entram na predição"""
+        # Nome e last_execution não afetam features nem reasoning
+        keys = [
+            (m.execution_time, m.failure_rate, m.code_coverage, m.business_impact, m.flakiness_score)
+            for m in test_metrics
+        ]
+        return self._cached_predictions('failure_predictor', keys, test_metrics,
+                                        self.ml_engine.predict_test_failure_batch)
+    
+    def _predict_execution_times(self, test_characteristics: List[Dict[str, Any]]) -> List[MLPrediction]:
+        """predict_execution_time_batch memoizado pelas características de cada teste"""
+        keys = []
+        for characteristics in test_characteristics:
+            try:
+                keys.append(frozenset((k, v) for k, v in characteristics.items() if k != 'name'))
+            except TypeError:
+                keys.append(None)  # Valores não hasheáveis: sem memo
+        return self._cached_predictions('performance_predictor', keys, test_characteristics,
+                                        self.ml_engine.predict_execution_time_batch)
+    
+    def _cached_predictions(self, model_name: str, keys: List[Optional[Hashable]], items: List[Any],
+                            predict_batch: Callable[[List[Any]], List[MLPrediction]]) -> List[MLPrediction]:
+        """Predições memoizadas por key; só as ausentes vão, num único lote, para predict_batch.
+        
+        O memo é descartado quando o engine troca o modelo ou o atualiza
+        (fit, partial_fit ou load incrementam model_versions).
+        """
+        model = self.ml_engine.models.get(model_name)
+        version = self.ml_engine.model_versions.get(model_name, 0)
+        cached = self._prediction_cache.get(model_name)
+        if cached is None or cached[0][0] is not model or cached[0][1] != version:
+            cached = self._prediction_cache[model_name] = ((model, version), {})
+        memo = cached[1]
+        
+        predictions = [memo.get(key) if key is not None else None for key in keys]
+        missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+        if missing:
+            for i, prediction in zip(missing, predict_batch([items[i] for i in missing])):
+                predictions[i] = prediction
+                if keys[i] is None:
+                    continue
+                if len(memo) >= PREDICTION_CACHE_SIZE:
+                    # Dicts mantêm ordem de inserção: a primeira chave é a mais antiga
+                    del memo[next(iter(memo))]
+                memo[keys[i]] = prediction
+        return predictions
+    
     def _generate_ml_recommendations(self, results: Dict[str, Any]) -> List[Dict[str, str]]:
         """Gera recomendações baseadas em toda análise ML"""
         recommendations = []
@@ -363,37 +475,56 @@ class MLTestingSuite:
         services = ['user-service', 'order-service', 'payment-service', 'api-gateway']
         levels = ['ERROR', 'WARNING', 'CRITICAL', 'INFO']
         
-        logs = []
-        for i in range(count):
-            logs.append({
-                'message': np.random.choice(log_templates),
-                'service': np.random.choice(services),
-                'timestamp': (datetime.now() - timedelta(hours=np.random.randint(0, 48))).isoformat(),
-                'level': np.random.choice(levels, p=[0.4, 0.3, 0.1, 0.2])
-            })
+        # Uma amostragem por campo em vez de quatro chamadas ao RNG por log
+        rng = np.random.default_rng()
+        messages = rng.choice(log_templates, size=count).tolist()
+        log_services = rng.choice(services, size=count).tolist()
+        hours_ago = rng.integers(0, 48, size=count).tolist()
+        log_levels = rng.choice(levels, size=count, p=[0.4, 0.3, 0.1, 0.2]).tolist()
         
-        return logs
+        now = datetime.now()
+        return [
+            {
+                'message': message,
+                'service': service,
+                'timestamp': (now - timedelta(hours=hours)).isoformat(),
+                'level': level
+            }
+            for message, service, hours, level in zip(messages, log_services, hours_ago, log_levels)
+        ]
     
     def _generate_sample_test_cases(self, count: int) -> List[TestCase]:
         """Gera test cases de exemplo"""
         test_types = ['SECURITY', 'API', 'DATABASE', 'INTEGRATION', 'UNIT', 'UI']
         business_impacts = list(BusinessImpact)
         
-        test_cases = []
-        for i in range(count):
-            test_cases.append(TestCase(
+        # Uma amostragem por campo, como em _generate_sample_logs. O impacto é
+        # sorteado por índice: np.random.choice sobre o Enum (subclasse de str)
+        # converte os membros em strings truncadas ('Business')
+        rng = np.random.default_rng()
+        sample_types = rng.choice(test_types, size=count).tolist()
+        execution_times = rng.uniform(10, 300, size=count).tolist()
+        failure_counts = rng.integers(0, 8, size=count).tolist()
+        coverages = rng.uniform(40, 95, size=count).tolist()
+        impact_indices = rng.integers(0, len(business_impacts), size=count).tolist()
+        recently_failed = (rng.random(size=count) > 0.7).tolist()
+        dependency_counts = rng.integers(0, 3, size=count).tolist()
+        
+        now = datetime.now().isoformat()
+        return [
+            TestCase(
                 name=f"test_sample_{i}",
                 file_path=f"test_sample_{i}.py",
-                test_type=np.random.choice(test_types),
-                execution_time=np.random.uniform(10, 300),
-                failure_count=np.random.randint(0, 8),
-                code_coverage=np.random.uniform(40, 95),
-                business_impact=np.random.choice(business_impacts),
-                last_failure=datetime.now().isoformat() if np.random.random() > 0.7 else None,
-                dependencies=[f"service_{j}" for j in range(np.random.randint(0, 3))]
-            ))
-        
-        return test_cases
+                test_type=sample_types[i],
+                execution_time=execution_times[i],
+                failure_count=failure_counts[i],
+                code_coverage=coverages[i],
+                business_impact=business_impacts[impact_indices[i]],
+                last_failure=now if recently_failed[i] else None,
+                dependencies=[f"service_{j}" for j in range(dependency_counts[i])]
+            )
+            for i in range(count)
+        ]
     
     def save_results(self, results: Dict[str, Any], filename: str = None):
         """Salva resultados da análise ML"""
@@ -409,8 +540,12 @@ class MLTestingSuite:
         filepath = os.path.join(reports_dir, filename)
         
         try:
-            with open(filepath, 'w') as f:
-                json.dump(results, f, indent=2, default=str)
+            # orjson serializa escalares/arrays NumPy direto; default=str cobre o resto
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(
+                    results, default=str,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                ))
             print(f"\n💾 Results saved to: {filepath}")
         except Exception as e:
             print(f"\n❌ Failed to save results: {e}")
@@ -0,0 +1,283 @@
+import re
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../ai-testing'))
+
+from sklearn.ensemble import IsolationForest
+import bug_pattern_analyzer
+from bug_pattern_analyzer import (BugPatternAnalyzer, CONFIG_ATTRIBUTES, BACKTRACK_SAFE_CHARS,
+                                  _analyze_shard)
+
+TIMESTAMP = "2026-01-01T10:00:00"
+
+def make_log(message, service="user-service"):
+    return {"message": message, "service": service, "timestamp": TIMESTAMP}
+
+# Short messages, long ones (linear search path) and multi-line ones (where "." stops at "\n")
+PADDING = " filler" * (BACKTRACK_SAFE_CHARS // 7 + 1)
+MESSAGES = [
+    "Connection timeout occurred",
+    "CRITICAL: NullPointerException in payment processing",
+    "Authentication failed for user request (401)",
+    "Validation error: invalid input on field email",
+    "Database connection refused",
+    "FATAL out of memory: heap space exhausted",
+    "Network error: connection reset by peer",
+    "Too many requests, rate limit exceeded (429)",
+    "User logged in",
+    "",
+    "null" + PADDING + "pointer",
+    "null" + PADDING + "\npointer",
+    "warning:" + PADDING + "read" + PADDING + "timeout",
+    "auth\n fail " + PADDING,
+    "host" + PADDING + "unreachable\nsql" + PADDING + "error",
+]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(bug_pattern_analyzer.time, "monotonic", fake)
+    return fake
+
+class TestHistoryEviction:
+
+    def test_top_patterns_cover_only_retained_entries(self):
+        """Test pattern counts shrink with the ring buffer instead of growing forever"""
+        analyzer = BugPatternAnalyzer(history_size=5)
+        for _ in range(20):
+            analyzer.analyze_log_entry(make_log("Connection timeout occurred"))
+        report = analyzer.generate_pattern_report()
+        assert report["summary"]["total_log_entries"] == 5
+        assert report["top_patterns"][0]["count"] == 5
+        assert report["top_patterns"][0]["percentage"] == 100.0
+
+    def test_evicted_patterns_leave_the_report(self):
+        """Test a pattern disappears once all its entries are evicted"""
+        analyzer = BugPatternAnalyzer(history_size=3)
+        analyzer.analyze_log_entry(make_log("NullPointerException in handler"))
+        for _ in range(3):
+            analyzer.analyze_log_entry(make_log("Rate limit exceeded"))
+        report = analyzer.generate_pattern_report()
+        assert [p["pattern"] for p in report["top_patterns"]] == ["rate_limit"]
+        assert "null_pointer" not in analyzer.pattern_frequency
+
+class TestShardConfig:
+
+    def test_worker_uses_parent_patterns(self):
+        """Test shard workers analyze with the parent's patterns and recommendations"""
+        parent = BugPatternAnalyzer(history_size=5)
+        parent.error_patterns["disk_full"] = r"(disk.*full|no space left)"
+        parent.pattern_recommendations["disk_full"] = "Free up disk space"
+        config = {name: getattr(parent, name) for name in CONFIG_ATTRIBUTES}
+        analyses = _analyze_shard([make_log("No space left on device")], 5, config,
+                                  IsolationForest(), False, None)
+        assert analyses[0]["patterns_detected"] == ["disk_full"]
+        assert "Free up disk space" in analyses[0]["recommendations"]
+
+    def test_analyze_many_matches_batch_with_custom_weights(self):
+        """Test process shards score like analyze_batch on a reconfigured analyzer"""
+        def configured():
+            analyzer = BugPatternAnalyzer(history_size=50)
+            analyzer.pattern_weights["connection_timeout"] = 0.05
+            analyzer.severity_weights["HIGH"] = 0.2
+            analyzer._compile_config()
+            return analyzer
+        logs = [make_log(f"Connection timeout error #{i}") for i in range(40)]
+        sharded = configured().analyze_many(logs, n_jobs=2, min_shard_size=10)
+        batched = configured().analyze_batch(logs)
+        assert [a["bug_probability"] for a in sharded] == [a["bug_probability"] for a in batched]
+        assert batched[0]["bug_probability"] == pytest.approx(0.25)
+
+class TestHistoryFeatures:
+
+    MESSAGES = ["Connection timeout occurred", "NullPointerException in handler",
+                "Rate limit exceeded", "User logged in", "Database error: sql error"]
+
+    def expected_features(self, analyzer):
+        return np.array([analyzer._extract_ml_features(entry) for entry in analyzer.bug_history],
+                        dtype=np.float32)
+
+    @pytest.mark.parametrize("history_size", [None, 7, 64])
+    def test_matrix_tracks_history_as_it_grows_and_wraps(self, history_size):
+        """Test the lazily grown feature buffer matches per-entry extraction"""
+        analyzer = BugPatternAnalyzer(history_size=history_size)
+        assert analyzer._history_features is None
+        for step in range(40):
+            analyzer.analyze_log_entry(make_log(self.MESSAGES[step % len(self.MESSAGES)]))
+            if step % 3 == 0:
+                np.testing.assert_array_equal(analyzer._history_feature_matrix(),
+                                              self.expected_features(analyzer))
+        np.testing.assert_array_equal(analyzer._history_feature_matrix(),
+                                      self.expected_features(analyzer))
+
+    def test_unbounded_history_keeps_every_entry(self):
+        """Test history_size=None keeps all analyses and still reports"""
+        analyzer = BugPatternAnalyzer(history_size=None)
+        for _ in range(30):
+            analyzer.analyze_log_entry(make_log("Connection timeout occurred"))
+        assert analyzer.generate_pattern_report()["summary"]["total_log_entries"] == 30
+        assert len(analyzer._history_feature_matrix()) == 30
+
+class FakeHyperscanDatabase:
+    """Stands in for a compiled hyperscan.Database: same scan() callback protocol"""
+
+    def __init__(self, patterns):
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        self.scans = 0
+
+    def scan(self, data, match_event_handler, context=None):
+        self.scans += 1
+        text = data.decode()
+        for pattern_id, pattern in enumerate(self.patterns):
+            match = pattern.search(text)
+            if match:
+                match_event_handler(pattern_id, match.start(), match.end(), 0, context)
+
+class TestBatchEquivalence:
+
+    def logs(self):
+        services = ["user-service", "order-service", "payment-service"]
+        return [make_log(message, services[i % len(services)]) for i, message in enumerate(MESSAGES * 3)]
+
+    def test_batch_matches_entry_by_entry(self):
+        """Test analyze_batch returns the same analyses as analyze_log_entry"""
+        single, batch = BugPatternAnalyzer(), BugPatternAnalyzer()
+        expected = [single.analyze_log_entry(log) for log in self.logs()]
+        assert batch.analyze_batch(self.logs()) == expected
+
+    def test_batch_keeps_the_same_aggregates(self):
+        """Test both paths leave identical counters and history"""
+        single, batch = BugPatternAnalyzer(history_size=20), BugPatternAnalyzer(history_size=20)
+        for log in self.logs():
+            single.analyze_log_entry(log)
+        batch.analyze_batch(self.logs())
+        assert list(batch.bug_history) == list(single.bug_history)
+        assert batch.pattern_frequency == single.pattern_frequency
+        assert batch.severity_counter == single.severity_counter
+        assert batch.service_high_prob == single.service_high_prob
+        np.testing.assert_array_equal(batch.hourly_counts, single.hourly_counts)
+        np.testing.assert_array_equal(batch._service_pattern_counts, single._service_pattern_counts)
+
+    def test_batch_matches_entry_by_entry_with_hyperscan(self):
+        """Test both paths scan through the compiled database when one is available"""
+        single, batch = BugPatternAnalyzer(), BugPatternAnalyzer()
+        for analyzer in (single, batch):
+            analyzer._hs_db = FakeHyperscanDatabase(analyzer.error_patterns.values())
+        expected = [single.analyze_log_entry(log) for log in self.logs()]
+        assert batch.analyze_batch(self.logs()) == expected
+        assert batch._hs_db.scans == len(self.logs())
+
+    def test_batch_uses_the_hyperscan_result(self):
+        """Test analyze_batch takes its detections from the database, not from re"""
+        analyzer = BugPatternAnalyzer()
+        analyzer._hs_db = FakeHyperscanDatabase(["quirk"] + list(analyzer.error_patterns.values())[1:])
+        analysis, = analyzer.analyze_batch([make_log("Quirk detected")])
+        assert analysis["patterns_detected"] == ["connection_timeout"]
+
+class TestProbabilityTable:
+
+    def test_table_matches_direct_sum(self):
+        """Test every (severity, pattern mask) cell equals the weight-by-weight sum"""
+        analyzer = BugPatternAnalyzer()
+        names = analyzer._pattern_names
+        for severity in ["CRITICAL", "HIGH", "MEDIUM", "LOW"]:
+            for mask in range(1 << len(names)):
+                detected = [name for bit, name in enumerate(names) if mask >> bit & 1]
+                analysis = {"severity": severity, "patterns_detected": detected}
+                direct = analyzer._traditional_probability(analysis)
+                assert analyzer._traditional_probability({**analysis, "patterns_mask": mask}) == direct
+
+    def test_table_is_skipped_for_many_patterns(self):
+        """Test large pattern sets fall back to the direct sum"""
+        analyzer = BugPatternAnalyzer()
+        for i in range(3):
+            analyzer.error_patterns[f"extra_{i}"] = f"(extra{i})"
+        analyzer._compile_config()
+        assert analyzer._probability_table is None
+        analysis = analyzer.analyze_log_entry(make_log("extra0 failure"))
+        assert analysis["bug_probability"] == pytest.approx(0.7 + 0.2)
+
+class TestPatternMatching:
+
+    def expected_patterns(self, analyzer, message):
+        return [name for name, pattern in analyzer.error_patterns.items()
+                if re.search(pattern, message, re.IGNORECASE)]
+
+    def test_literal_split_matches_regex(self):
+        """Test the literal/regex split detects exactly what the full regex does"""
+        analyzer = BugPatternAnalyzer()
+        for message in MESSAGES:
+            message = message.lower()
+            for name, pattern in analyzer.error_patterns.items():
+                literals, regex = analyzer._pattern_matchers[name]
+                expected = re.search(pattern, message, re.IGNORECASE) is not None
+                assert analyzer._has_pattern(message, literals, regex) == expected
+
+    def test_linear_chains_match_regex_on_long_messages(self):
+        """Test the linear 'a.*b' search agrees with re.search, newlines included"""
+        analyzer = BugPatternAnalyzer()
+        for message in MESSAGES:
+            message = message.lower()
+            for name, pattern in analyzer.error_patterns.items():
+                expected = re.search(pattern, message, re.IGNORECASE) is not None
+                assert analyzer._has_pattern_linear(message, *analyzer._linear_matchers[name]) == expected
+            assert analyzer._match_patterns(message) == self.expected_patterns(analyzer, message)
+
+    def test_patterns_with_escapes_or_nested_groups_stay_on_regex(self):
+        """Test patterns the split cannot handle keep their regex semantics"""
+        analyzer = BugPatternAnalyzer()
+        analyzer.error_patterns["status_5xx"] = r"(status\s5\d\d)"
+        analyzer.error_patterns["retry"] = r"((retry|retries).*exhausted)"
+        analyzer._compile_config()
+        for message in ["Status 503 from upstream", "retries" + PADDING + "exhausted",
+                        "retry\nexhausted", "status 5xx"]:
+            message = message.lower()
+            assert analyzer._match_patterns(message) == self.expected_patterns(analyzer, message)
+
+class TestReportCaching:
+
+    def fill(self, analyzer, count=12):
+        for i in range(count):
+            analyzer.analyze_log_entry(make_log(MESSAGES[i % 9], f"service-{i % 3}"))
+
+    def test_report_is_reused_until_new_analyses(self, clock):
+        """Test repeated polls reuse the report and a new analysis rebuilds it"""
+        analyzer = BugPatternAnalyzer()
+        self.fill(analyzer)
+        report = analyzer.generate_pattern_report()
+        assert analyzer.generate_pattern_report() is report
+        analyzer.analyze_log_entry(make_log("Connection timeout occurred"))
+        rebuilt = analyzer.generate_pattern_report()
+        assert rebuilt is not report
+        assert rebuilt["summary"]["total_log_entries"] == 13
+
+    def test_report_expires_after_ttl(self, clock):
+        """Test a cached report is rebuilt once REPORT_CACHE_TTL elapses"""
+        analyzer = BugPatternAnalyzer()
+        self.fill(analyzer)
+        report = analyzer.generate_pattern_report()
+        clock.now += bug_pattern_analyzer.REPORT_CACHE_TTL
+        assert analyzer.generate_pattern_report() is not report
+
+    def test_cached_clusters_match_a_fresh_analyzer(self):
+        """Test clusters are reused for the same history and equal a cold computation"""
+        analyzer = BugPatternAnalyzer()
+        self.fill(analyzer)
+        clusters = analyzer._cluster_similar_bugs()
+        assert analyzer._cluster_similar_bugs() is clusters
+        self.fill(analyzer, 6)
+        updated = analyzer._cluster_similar_bugs()
+        assert updated is not clusters
+        cold = BugPatternAnalyzer()
+        self.fill(cold)
+        self.fill(cold, 6)
+        assert updated == cold._cluster_similar_bugs()
@@ -0,0 +1,117 @@
+import pytest
+import json
+import re
+import logging
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../services/user-service'))
+
+from logger import StructuredFormatter, StructuredLogger
+
+formatter = StructuredFormatter("user-service")
+
+def make_record(message, **extra):
+    record = logging.LogRecord("user-service", logging.INFO, __file__, 1, message, None, None)
+    record.__dict__.update(extra)
+    return record
+
+class TestStructuredFormatter:
+
+    def test_format_produces_json_entry(self):
+        """Test formatted record is a JSON document with the service fields"""
+        entry = json.loads(formatter.format(make_record("User created", user_id="abc")))
+        assert entry["message"] == "User created"
+        assert entry["level"] == "INFO"
+        assert entry["service"] == "user-service"
+        assert entry["user_id"] == "abc"
+        assert re.fullmatch(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{6}Z", entry["timestamp"])
+
+    def test_logrecord_internals_are_not_emitted(self):
+        """Test only extra fields are copied from the record"""
+        entry = json.loads(formatter.format(make_record("User created", user_id="abc")))
+        for internal in ("msg", "args", "lineno", "pathname", "thread", "created"):
+            assert internal not in entry
+        assert list(entry)[-1] == "user_id"
+
+    def test_control_characters_are_neutralized(self):
+        """Test newlines and ANSI escapes cannot inject fake log lines"""
+        sanitized = formatter._sanitize_log_message("line1\nline2\r\x1b[31mred\x1b[0m")
+        assert sanitized == "line1 line2 red"
+
+    def test_sensitive_data_is_masked(self):
+        """Test emails, secrets, cards and phones are masked"""
+        sanitized = formatter._sanitize_log_message(
+            "user john@example.com password=hunter2 card 4111 1111 1111 1111 phone 555-123-4567"
+        )
+        assert "john@" not in sanitized
+        assert "***@example.com" in sanitized
+        assert "hunter2" not in sanitized
+        assert "password: ***" in sanitized
+        assert "****-****-****-****" in sanitized
+        assert "***-***-****" in sanitized
+
+    def test_secret_keywords_are_matched_case_insensitively(self):
+        """Test secret masking keeps the keyword as written"""
+        sanitized = formatter._sanitize_log_message("PASSWORD: x Token=y")
+        assert sanitized == "PASSWORD: *** Token: ***"
+    
+    def test_clean_messages_pass_through_unchanged(self):
+        """Test messages with nothing to sanitize are returned as-is"""
+        for message in ("User created", "Usuário criado com sucesso", "Order shipped"):
+            assert formatter._sanitize_log_message(message) == message
+
+    def test_long_messages_are_truncated(self):
+        """Test messages are capped to prevent log flooding"""
+        sanitized = formatter._sanitize_log_message("a" * 5000)
+        assert len(sanitized) == 1000
+        assert sanitized.endswith("...")
+
+    def test_secret_straddling_the_scan_cut_is_masked(self):
+        """Test a secret crossing the scan bound is masked, not cut in half"""
+        # Escape sequences are stripped, so the email lands inside the output
+        message = "\x1b[0m" * 995 + " " * 10 + "alice.secret@example.com" + " " * 500
+        sanitized = formatter._sanitize_log_message(message)
+        assert "alice" not in sanitized
+        assert "***@example.com" in sanitized
+
+    def test_partial_token_at_scan_end_is_dropped(self):
+        """Test text past the scan bound never reaches the output"""
+        message = "\x1b[0m" * 1060 + " " * 10 + "a" * 300 + "@example.com"
+        sanitized = formatter._sanitize_log_message(message)
+        assert "a" * 50 not in sanitized
+
+class TestStructuredLogger:
+
+    def test_records_are_written_by_background_listener(self, capsys):
+        """Test queued records are flushed as JSON lines on stop"""
+        log = StructuredLogger("logger-test-service")
+        log.info("queued", request_id="r1")
+        log.warning("second")
+        log.stop()
+        lines = capsys.readouterr().out.strip().splitlines()
+        entries = [json.loads(line) for line in lines]
+        assert [e["message"] for e in entries] == ["queued", "second"]
+        assert entries[0]["request_id"] == "r1"
+        assert entries[1]["level"] == "WARNING"
+
+    def test_records_below_level_are_dropped(self, capsys):
+        """Test the level check happens before anything is enqueued"""
+        log = StructuredLogger("logger-level-test-service")
+        log.logger.setLevel(logging.ERROR)
+        log.info("hidden")
+        log.error("shown")
+        log.stop()
+        entries = [json.loads(line) for line in capsys.readouterr().out.strip().splitlines()]
+        assert [e["message"] for e in entries] == ["shown"]
+
+    def test_logger_and_handler_filters_are_honoured(self, capsys):
+        """Test the enqueue fast path still runs logger and handler filters"""
+        log = StructuredLogger("logger-filter-test-service")
+        log.logger.addFilter(lambda record: record.getMessage() != "dropped by logger")
+        log._queue_handler.addFilter(lambda record: record.getMessage() != "dropped by handler")
+        log.info("dropped by logger")
+        log.info("dropped by handler")
+        log.info("kept")
+        log.stop()
+        entries = [json.loads(line) for line in capsys.readouterr().out.strip().splitlines()]
+        assert [e["message"] for e in entries] == ["kept"]
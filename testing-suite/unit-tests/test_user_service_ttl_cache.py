@@ -0,0 +1,110 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../services/user-service'))
+
+import ttl_cache
+from ttl_cache import FastTTL, FixedWindowCounter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", fake)
+    return fake
+
+class TestFastTTL:
+
+    def test_entries_expire_after_ttl(self, clock):
+        """Test entries are visible until the TTL elapses"""
+        cache = FastTTL(maxsize=10, ttl=60)
+        cache["token"] = True
+        assert "token" in cache
+        clock.now += 61
+        assert "token" not in cache
+        assert len(cache) == 0
+
+    def test_oldest_entry_is_evicted_when_full(self, clock):
+        """Test the cache never grows past maxsize"""
+        cache = FastTTL(maxsize=2, ttl=60)
+        cache["a"] = 1
+        cache["b"] = 2
+        cache["c"] = 3
+        assert "a" not in cache
+        assert cache.get("b") == 2
+        assert cache.get("c") == 3
+
+    def test_sweep_removes_only_expired_entries(self, clock):
+        """Test bulk expiry keeps live entries"""
+        cache = FastTTL(maxsize=10, ttl=60)
+        cache["old"] = 1
+        clock.now += 30
+        cache["new"] = 2
+        clock.now += 31
+        assert cache.sweep() == 1
+        assert "new" in cache
+
+class TestFixedWindowCounter:
+
+    def test_hits_count_within_window(self, clock):
+        """Test counters reset once their window ends"""
+        counter = FixedWindowCounter(maxsize=10, window=60)
+        assert [counter.hit("127.0.0.1") for _ in range(3)] == [1, 2, 3]
+        clock.now += 30
+        assert counter.hit("127.0.0.1") == 4
+        clock.now += 30
+        assert counter.hit("127.0.0.1") == 1
+
+    def test_keys_are_counted_independently(self, clock):
+        """Test each client IP has its own window"""
+        counter = FixedWindowCounter(maxsize=10, window=60)
+        counter.hit("10.0.0.1")
+        counter.hit("10.0.0.1")
+        assert counter.hit("10.0.0.2") == 1
+
+    def test_oldest_key_is_evicted_when_full(self, clock):
+        """Test the counter never tracks more than maxsize keys"""
+        counter = FixedWindowCounter(maxsize=2, window=60)
+        for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+            counter.hit(ip)
+        assert len(counter) == 2
+        assert counter.hit("10.0.0.1") == 1
+
+    def test_sweep_removes_finished_windows(self, clock):
+        """Test bulk expiry keeps keys whose window is still open"""
+        counter = FixedWindowCounter(maxsize=10, window=60)
+        counter.hit("old")
+        clock.now += 30
+        counter.hit("new")
+        clock.now += 30
+        assert counter.sweep() == 1
+        assert counter.hit("new") == 2
+
+    def test_allow_admits_limit_plus_one_hits_per_window(self, clock):
+        """Test the limiter keeps the check-before-increment boundary"""
+        counter = FixedWindowCounter(maxsize=10, window=60)
+        results = [counter.allow("127.0.0.1", 200) for _ in range(202)]
+        assert results[:201] == [True] * 201
+        assert results[201] is False
+
+    def test_allow_does_not_count_rejected_hits(self, clock):
+        """Test rejected requests leave the window count unchanged"""
+        counter = FixedWindowCounter(maxsize=10, window=60)
+        for _ in range(10):
+            counter.allow("127.0.0.1", 2)
+        assert counter.slots["127.0.0.1"][0] == 3
+
+    def test_allow_resets_when_window_ends(self, clock):
+        """Test a fixed window reopens once it ends"""
+        counter = FixedWindowCounter(maxsize=10, window=60)
+        for _ in range(5):
+            counter.allow("127.0.0.1", 2)
+        assert counter.allow("127.0.0.1", 2) is False
+        clock.now += 60
+        assert counter.allow("127.0.0.1", 2) is True
@@ -1,4 +1,5 @@
 import pytest
+import re
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../services/user-service'))
@@ -49,6 +50,7 @@ class TestUserServiceUnit:
         response = client.get(f"/users/{user_id}")
         assert response.status_code == 200
         assert response.json()["id"] == user_id
+        assert response.json() == create_response.json()
     
     def test_get_user_not_found(self):
         """Test getting non-existent user"""
@@ -62,6 +64,17 @@ class TestUserServiceUnit:
         assert response.status_code == 200
         assert isinstance(response.json(), list)
     
+    def test_list_users_pagination(self):
+        """Test offset and limit page through users in creation order"""
+        for i in range(3):
+            client.post("/users", json={"name": f"Page User {i}", "email": f"page{i}@example.com"})
+        all_users = client.get("/users", params={"limit": 1000}).json()
+        
+        response = client.get("/users", params={"offset": 1, "limit": 2})
+        assert response.status_code == 200
+        assert response.json() == all_users[1:3]
+        assert client.get("/users", params={"limit": 0}).status_code == 422
+    
     def test_delete_user_exists(self):
         """Test deleting existing user"""
         # Create user first
@@ -81,4 +94,44 @@ class TestUserServiceUnit:
     def test_delete_user_not_found(self):
         """Test deleting non-existent user"""
         response = client.delete("/users/non-existent-id")
-        assert response.status_code == 404
\ No newline at end of file
+        assert response.status_code == 404
+    
+    def test_create_user_duplicate_email(self):
+        """Test creating a user with an existing email is rejected"""
+        user_data = {"name": "Duplicate User", "email": "duplicate@example.com"}
+        assert client.post("/users", json=user_data).status_code == 200
+        
+        response = client.post("/users", json={"name": "Other User", "email": "DUPLICATE@example.com"})
+        assert response.status_code == 400
+        assert "Email already exists" in response.json()["detail"]
+    
+    def test_email_reusable_after_delete(self):
+        """Test deleting a user frees its email for new accounts"""
+        user_data = {"name": "Reuse User", "email": "reuse@example.com"}
+        user_id = client.post("/users", json=user_data).json()["id"]
+        client.delete(f"/users/{user_id}")
+        
+        response = client.post("/users", json=user_data)
+        assert response.status_code == 200
+    
+    def test_create_user_name_validation(self):
+        """Test names are limited to the allowed character set"""
+        for name in ("O'Brien-Smith Jr.", "user_01"):
+            response = client.post("/users", json={"name": name, "email": f"{name[:4]}@names.com"})
+            assert response.status_code == 200
+        for name in ("<script>", "Robert; DROP", "a\x00b"):
+            response = client.post("/users", json={"name": name, "email": "bad@names.com"})
+            assert response.status_code == 422
+    
+    def test_user_ids_are_unique_hex(self):
+        """Test pooled user ids stay unique across pool refills"""
+        from main import next_user_id, USER_ID_BATCH
+        ids = [next_user_id() for _ in range(USER_ID_BATCH * 3)]
+        assert len(set(ids)) == len(ids)
+        assert all(len(i) == 32 and int(i, 16) >= 0 for i in ids)
+    
+    def test_csrf_tokens_are_unique_urlsafe(self):
+        """Test pooled CSRF tokens are distinct 32-char urlsafe strings"""
+        tokens = [client.get("/csrf-token").json()["csrf_token"] for _ in range(5)]
+        assert len(set(tokens)) == len(tokens)
+        assert all(re.fullmatch(r"[A-Za-z0-9_-]{32}", t) for t in tokens)